@@ -1,20 +1,39 @@
 from .args import Args, GeneratorArgs
-from .renderer import Renderer, PPrintRenderer, MultilineRenderer, ImshowRenderer
+from .renderer import (Renderer, SizeAwareRenderer, PPrintRenderer,
+                       MultilineRenderer, ImshowRenderer)
 from .callrenderer import CallRenderer, PPrintCallRenderer, IsliceRenderer
 
 from .exercise_function import (
     ExerciseFunction, ExerciseFunctionNumpy, ExerciseFunctionPandas)
-from .exercise_regexp import ExerciseRegexp, ExerciseRegexpGroups
+from .exercise_regexp import (
+    ExerciseRegexp, ExerciseRegexpGroups, ExerciseRegexpCorpus)
 from .exercise_generator import ExerciseGenerator
+from .exercise_perf import ExerciseFunctionPerf
 from .exercise_class import (
-    ExerciseClass, ClassScenario, ClassExpression, ClassStatement)
+    ExerciseClass, ClassScenario, ScenarioBranch, ClassExpression, ClassStatement,
+    MethodCall)
+from .exercise_fuzz import ExerciseClassFuzz
+from .bundle import use_bundle
 
 from .content import (TextContent, CodeContent, MathContent,
                       MarkdownContent, MarkdownMathContent)
-from .quiz import (Quiz, QuizQuestion, Explanation,
-                   Option, CodeOption, MathOption, MarkdownOption, MarkdownMathOption)
-from .quiz_loader import run_yaml_quiz
-
-from .quiz_help import quiz_help
+from .results import Evaluation, DatasetResult
 
 from .version import __version__
+
+
+# the quiz-related names are loaded on demand, so that exercises
+# can be evaluated - see evaluate() - without importing ipywidgets
+_LAZY_NAMES = {
+    'quiz': ('Quiz', 'QuizQuestion', 'Explanation', 'Option', 'CodeOption',
+             'MathOption', 'MarkdownOption', 'MarkdownMathOption'),
+    'quiz_loader': ('run_yaml_quiz',),
+    'quiz_help': ('quiz_help',),
+}
+
+def __getattr__(name):
+    import importlib
+    for module, names in _LAZY_NAMES.items():
+        if name in names:
+            return getattr(importlib.import_module(f".{module}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,13 +2,70 @@
 
 # pylint: disable=c0111, r1705
 
+import sys
 import copy
+import pickle
 import pprint
+import hashlib
 import itertools
+from types import FunctionType, BuiltinFunctionType
 from collections.abc import Iterable, Iterator
 
 from .helpers import custom_repr
 
+
+# exact types whose instances can safely be shared between calls
+ATOMIC_TYPES = {
+    type(None), type(Ellipsis), bool, int, float, complex, str, bytes, range,
+    type, FunctionType, BuiltinFunctionType,
+}
+
+def is_immutable(obj):
+    """
+    whether obj can be shared instead of being copied - conservatively,
+    i.e. when in doubt, answer False
+    """
+    kind = type(obj)
+    if kind in ATOMIC_TYPES:
+        return True
+    if kind in (tuple, frozenset):
+        return all(is_immutable(x) for x in obj)
+    # no need to import numpy if not already loaded
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and kind is numpy.ndarray:
+        return not obj.flags.writeable and not obj.dtype.hasobject
+    return False
+
+
+def canonical(obj):
+    """
+    a version of obj whose pickle does not depend on hash randomization,
+    so that fingerprints match across processes - see fingerprint();
+    sets and frozensets, in builtin containers, are replaced with
+    their items pickled and sorted; dicts keep their order, which is
+    not random, and that the code at work may depend upon
+    """
+    kind = type(obj)
+    if kind in (list, tuple):
+        return kind(canonical(x) for x in obj)
+    if kind is dict:
+        return ('dict', tuple((canonical(key), canonical(value))
+                              for (key, value) in obj.items()))
+    if kind in (set, frozenset):
+        return (kind.__name__, tuple(sorted(pickle.dumps(canonical(x)) for x in obj)))
+    return obj
+
+
+def digest(contents):
+    """
+    the sha1 of contents, or None if they can't be pickled
+    """
+    try:
+        return hashlib.sha1(pickle.dumps(canonical(contents))).hexdigest()
+    except Exception:                                   # pylint: disable=w0703
+        return None
+
+
 ####################
 # From June 2016, this class should not need to be used directly
 # as Args would allow to build it with a nicer interface
@@ -33,6 +90,8 @@ class ArgsTupleDict:
         # can be overridden later on using 'render_prefix'
         self.prefix = ""
         self.postfix = ""
+        # for copy_mode='auto', see clone()
+        self._immutables = None
 
 
     def __repr__(self):
@@ -60,13 +119,56 @@ class ArgsTupleDict:
         return method(*self.args, **self.keywords)
 
     def clone(self, copy_mode):
-        "clone this input for safety"
+        """
+        clone this input for safety
+
+        copy_mode 'auto' is like 'deep', except that the arguments that
+        are immutable - see is_immutable() - are shared and not copied
+        """
         if copy_mode == 'shallow':
             return copy.copy(self)
         elif copy_mode == 'deep':
             return copy.deepcopy(self)
+        elif copy_mode == 'auto':
+            return self._auto_clone()
         else:
             return self
+
+    def _auto_clone(self):
+        args_flags, keywords_flags = self._immutable_flags()
+        result = copy.copy(self)
+        # one memo for all arguments, so that sharing between them is preserved
+        memo = {}
+        result.args = tuple(
+            arg if immutable else copy.deepcopy(arg, memo)
+            for (arg, immutable) in zip(self.args, args_flags))
+        result.keywords = {
+            k: v if keywords_flags[k] else copy.deepcopy(v, memo)
+            for (k, v) in self.keywords.items()}
+        return result
+
+    def _immutable_flags(self):
+        """
+        which arguments are immutable; computed once, and
+        cached as long as args and keywords are not rebound
+        """
+        if (self._immutables is None
+                or self._immutables[0] is not self.args
+                or self._immutables[1] is not self.keywords):
+            flags = ([is_immutable(arg) for arg in self.args],
+                     {k: is_immutable(v) for (k, v) in self.keywords.items()})
+            self._immutables = (self.args, self.keywords, flags)
+        return self._immutables[2]
+
+    def fingerprint(self):
+        """
+        a digest of the arguments contents, used to spot
+        changes in datasets; returns None if they can't be pickled
+        """
+        return digest(self._contents())
+
+    def _contents(self):
+        return self.args, self.keywords
     
     # # rendering  
     def tokens(self):
@@ -120,6 +222,31 @@ class GeneratorArgs(Args):
         return list(itertools.islice(iterable, *self.islice))
 
 
+    def iterate(self, function):
+        """
+        the lazy counterpart of call(): function is expected to return
+        an iterator, that is returned with islice applied, but not consumed
+        """
+        iterable = super().call(function)
+        if not isinstance(iterable, Iterable):
+            raise TypeError(f"not an iterable! received a {type(iterable).__name__} instance: {iterable}")
+        if not self.islice:
+            return iter(iterable)
+        return itertools.islice(iterable, *self.islice)
+
+
+    def _contents(self):
+        return self.args, self.keywords, self.islice
+
+
+    def call_fingerprint(self):
+        """
+        like fingerprint(), but regardless of islice; datasets
+        that share it produce the same iterator, only sliced differently
+        """
+        return digest(super()._contents())
+
+
     # handles iterator when part of self.args
     # this is a part of aborted 0.6.1
     # intention was to be smart about copying iterators
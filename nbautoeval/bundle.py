@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111, w0703
+
+"""
+results bundles: the results of the reference solutions, computed
+once and for all - see the nbae-precompute command - so that the
+students kernels do not need to run the solutions at all
+
+a bundle is a single file, made of
+* a fixed-size header: MAGIC, the format version, and the index size
+* the index, in JSON, that maps
+  bundle key -> dataset index -> [fingerprint, offset, length]
+  where the bundle key is computed by the exercise from its exoname
+  and solution, see ExerciseFunction.bundle_key()
+* the pickled results, one blob per dataset, at offset in the blobs area
+
+the file is memory-mapped, and only the index is parsed when a bundle
+is opened; a blob is unpickled only when the corresponding dataset
+gets corrected
+
+bundles are found either
+* through the NBAUTOEVAL_BUNDLE env. variable, a list of paths
+  separated like in PATH, or
+* by calling use_bundle(path), typically in the __init__.py
+  of the exercises package
+"""
+
+import os
+import json
+import mmap
+import pickle
+import struct
+from pathlib import Path
+
+from .version import __version__
+
+
+MAGIC = b"NBAEBNDL"
+FORMAT_VERSION = 1
+# magic, format version, index size
+HEADER = struct.Struct("<8sIQ")
+
+
+class Bundle:
+    """
+    a read-only, lazily opened, results bundle
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._mmap = None
+        self._index = None
+        self._blobs_offset = None
+
+    def __repr__(self):
+        return f"<Bundle {self.path}>"
+
+    def _open(self):
+        if self._index is not None:
+            return
+        with self.path.open('rb') as feed:
+            self._mmap = mmap.mmap(feed.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a nbautoeval bundle")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} has format version {version}, "
+                             f"expected {FORMAT_VERSION}")
+        index_start = HEADER.size
+        self._blobs_offset = index_start + index_size
+        index = json.loads(self._mmap[index_start:self._blobs_offset].decode())
+        self._index = index['exercises']
+
+    def keys(self):
+        self._open()
+        return list(self._index)
+
+    def lookup(self, key, index, fingerprint):
+        """
+        returns the tuple (expected, ref_exc) that was recorded
+        for that dataset, or None
+        """
+        self._open()
+        try:
+            recorded, offset, length = self._index[key][str(index)]
+        except KeyError:
+            return None
+        if recorded != fingerprint:
+            return None
+        start = self._blobs_offset + offset
+        return pickle.loads(self._mmap[start:start+length])
+
+
+def write_bundle(path, exercises):
+    """
+    computes the expected results of all exercises - ExerciseFunction instances
+    and subclasses, or the scenario transcripts of ExerciseClass instances -
+    and stores them in path
+
+    returns the number of results that were stored
+    """
+    index, blobs, offset = {}, [], 0
+    for exo in exercises:
+        key = exo.bundle_key()
+        if key in index:
+            # typically the same exercise with other rendering settings
+            recorded = {int(i): entry[0] for (i, entry) in index[key].items()}
+            # datasets for functions, scenarios for classes
+            inputs = exo.scenarios if hasattr(exo, 'scenarios') else exo.datasets
+            fingerprints = {i: item.fingerprint() for (i, item) in enumerate(inputs)}
+            if any(fingerprints.get(i) != f for (i, f) in recorded.items()):
+                print(f"WARNING: {exo.name}: other datasets already stored "
+                      f"under the same key {key} - ignored")
+            continue
+        entries = index[key] = {}
+        for dataset_index, (fingerprint, expected, ref_exc) in enumerate(exo.expected_results()):
+            if fingerprint is None:
+                print(f"WARNING: {exo.name}: dataset #{dataset_index+1} can't be fingerprinted")
+                continue
+            try:
+                blob = pickle.dumps((expected, ref_exc))
+            except Exception as exc:
+                print(f"WARNING: {exo.name}: result for dataset #{dataset_index+1} "
+                      f"can't be stored ({type(exc).__name__}: {exc})")
+                continue
+            entries[str(dataset_index)] = [fingerprint, offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+    index_bytes = json.dumps(dict(nbautoeval=__version__, exercises=index)).encode()
+    with Path(path).open('wb') as writer:
+        writer.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(index_bytes)))
+        writer.write(index_bytes)
+        for blob in blobs:
+            writer.write(blob)
+    return len(blobs)
+
+
+########## the bundles in use
+_BUNDLES = []
+_BUNDLES_FROM_ENV = False
+
+
+def use_bundle(path):
+    """
+    declare a bundle file to be searched for expected results;
+    the file is opened only when needed
+    """
+    _BUNDLES.append(Bundle(path))
+
+
+def bundle_lookup(key, index, fingerprint):
+    """
+    search all known bundles for that dataset
+
+    returns a tuple (expected, ref_exc), or None
+    """
+    global _BUNDLES_FROM_ENV                            # pylint: disable=w0603
+    if not _BUNDLES_FROM_ENV:
+        _BUNDLES_FROM_ENV = True
+        for path in os.environ.get('NBAUTOEVAL_BUNDLE', '').split(os.pathsep):
+            if path:
+                use_bundle(path)
+    for bundle in list(_BUNDLES):
+        try:
+            found = bundle.lookup(key, index, fingerprint)
+        except Exception as exc:
+            print(f"WARNING: ignoring bundle {bundle.path} - {type(exc).__name__}: {exc}")
+            _BUNDLES.remove(bundle)
+            continue
+        if found is not None:
+            return found
+    return None
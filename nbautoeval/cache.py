@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111
+
+"""
+the results of the reference solution never change between
+two corrections, so they can be remembered
+
+entries are keyed by the index of the dataset, and are valid
+only for the fingerprint of the dataset they were computed from,
+so that changing the contents of a dataset is properly noticed
+"""
+
+
+class ReferenceCache:
+    """
+    a mapping index -> entry, where an entry is a plain dict that
+    holds the fingerprint, the reference results and, under 'contents',
+    the corresponding rendered Content objects
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def __repr__(self):
+        return f"<ReferenceCache with {len(self.entries)} entries>"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, index, fingerprint):
+        """
+        returns the entry for that index, or None if there is none
+        or if it was computed from another fingerprint
+        """
+        if fingerprint is None:
+            return None
+        entry = self.entries.get(index)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry
+
+    def store(self, index, fingerprint, **values):
+        entry = dict(fingerprint=fingerprint, contents={})
+        entry.update(values)
+        self.entries[index] = entry
+        return entry
+
+    def invalidate(self, index=None):
+        """
+        forget about one index, or about all of them if index is None
+        """
+        if index is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(index, None)
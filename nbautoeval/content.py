@@ -1,9 +1,10 @@
 # an earlier version was relying on markdown2
 #from myst_parser.main import to_html, default_parser
 
-from markdown_it import MarkdownIt
+# ipywidgets and markdown_it are imported only when widgets get created,
+# so that exercises can be evaluated without these dependencies
 
-from ipywidgets import HTML, HTMLMath, Layout, Image
+from .helpers import format_duration
 
 class Content:
 
@@ -117,9 +118,11 @@ class TextContent(Content):
         return self
 
     def _widget_(self):
+        from ipywidgets import HTML, HTMLMath
 
         text = self.text
         if self.has_markdown:
+            from markdown_it import MarkdownIt
             parser = MarkdownIt("commonmark")
             text = parser.render(text)
         if self.is_code:
@@ -174,6 +177,7 @@ class CssContent(Content):
         return f"<CssContent {self.plain_css}>"
 
     def _widget_(self):
+        from ipywidgets import HTML
         html = f"<style>{self.plain_css}</style>"
         return HTML(html, layout={'display': 'none'})
 
@@ -187,6 +191,7 @@ class ResultContent(Content):
 
 
     def _widget_(self):
+        from ipywidgets import HTML
         symbol = "fa-check" if self.boolean else "fa-close"
 
         html = f'<span {self.style_attribute()} class="fa {symbol}"></span>'
@@ -201,9 +206,24 @@ class ResultContent(Content):
     def the_class(self):
         return 'ok' if self.boolean else 'ko'
 
+
+class TimingsContent(TextContent):
+    """
+    the durations in a timings dict - in seconds - one per line
+    """
+
+    def __init__(self, timings, **kwds):
+        text = "\n".join(f"{key} {format_duration(duration)}"
+                         for (key, duration) in timings.items())
+        super().__init__(text, is_code=True, **kwds)
+        self.add_class('timings')
+
+
 class ImshowContent(Content):
     """
     a numpy (2d) ndarray, with a (css) width
+
+    the PNG image is produced by png.py, with no need for matplotlib
     """
 
     def __init__(self, ndarray, css_width, cmap, **kwds):
@@ -213,20 +233,14 @@ class ImshowContent(Content):
         super().__init__(**kwds)
 
     def _widget_(self):
-        # using a BytesIO to perform imsave in memory
-        from matplotlib.pyplot import imsave
-        import base64
-        import io
-        import tempfile
-        with io.BytesIO() as temp:
-            kwds = {}
-            if self.cmap is not None:
-                kwds['cmap'] = self.cmap
-            imsave(temp, self.ndarray, **kwds)
-            temp.seek(0)
-            image_bytes = temp.read()
+        from ipywidgets import HTML
+        from .png import png_base64
+        # no need for more pixels than what gets displayed
+        max_size = 1024
+        if isinstance(self.css_width, str) and self.css_width.endswith('px'):
+            max_size = max(int(float(self.css_width[:-2])), 1)
         # must be a str
-        b64repr = base64.b64encode(image_bytes).decode(encoding="ascii")
+        b64repr = png_base64(self.ndarray, self.cmap, max_size)
         html = (f"<img"
                 f" width='{self.css_width}' "
                 f" style='image-rendering: pixelated'"
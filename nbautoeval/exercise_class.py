@@ -2,14 +2,22 @@
 
 # pylint: disable=c0111, c0103, r1705, w0703
 
-from ipywidgets import GridBox, Layout
+import copy
+import pickle
+import hashlib
+from concurrent.futures.process import BrokenProcessPool
 
 from .args import Args
-from .content import TextContent, CssContent, ResultContent
+from .content import TextContent, CssContent, ResultContent, TimingsContent
 from .callrenderer import Call, CallRenderer
-from .renderer import Renderer
-from .helpers import default_font_size, default_header_font_size
+from .renderer import SizeAwareRenderer
+from .helpers import default_font_size, default_header_font_size, timed
 from .storage import log_correction, log2_correction
+from .limits import limited, LimitExceeded
+from .results import StepResult, total_timings
+from .parallel import check_executor, process_pool, unpicklable
+from .cache import ReferenceCache
+from .bundle import bundle_lookup
 
 
 DEBUG = False
@@ -26,6 +34,11 @@ default_column_headers = (
 column_span_classes = (
     ["span-1-to-4", "scenario"], [], [], ["span-3-to-4"],
 )
+# with show_timings=True
+timings_column_header = "durées"
+timings_column_span_classes = (
+    ["span-1-to-5", "scenario"], [], [], ["span-3-to-4"], [],
+)
 # simpler in example mode
 example_column_span_classes = (
     ["span-1-to-2", "scenario"], [], [],
@@ -61,6 +74,13 @@ CSS = """
 .nbae-cls .span-1-to-4 {
     grid-column: 1 / span 4;
 }
+.nbae-cls .span-1-to-5 {
+    grid-column: 1 / span 5;
+}
+.nbae-cls .timings {
+    font-size: 80%;
+    color: #666;
+}
 .nbae-cls .span-3-to-4 {
     grid-column: 3 / span 2;
 }
@@ -108,6 +128,9 @@ div.nbae-cls div.widget-html-content pre {
 .nbae-cls div.widget-html-content {
     display: flex;
 }
+.nbae-cls .limit-exceeded, .nbae-cls .skipped, .nbae-cls .note {
+    font-style: italic;
+}
 """
 
 
@@ -117,21 +140,52 @@ class ClassExpression:
     it is basically built from a string where
         'INSTANCE' is the object created in the first step, and
         'CLASS' is the class object itself
+
+    the code is compiled only once, on first use, and then run
+    in a namespace where these 2 names are bound, see run()
     """
     
     def __init__(self, code, statement=False):
         self.code = code
         self.statement = statement
+        self._compiled = None
         
     def __repr__(self):
         #  return f"<{type(self).__name__} {self.statement=} {self.code=}>"
         return f"<{type(self).__name__} statement={self.statement} code={self.code}>"
         
         
+    def __getstate__(self):
+        # code objects can't be pickled, they are compiled again when needed
+        state = dict(vars(self))
+        state['_compiled'] = None
+        return state
+
+
     def replace(self, varname, classname):
         return self.code.replace("INSTANCE", varname).replace("CLASS", classname)
 
 
+    def compiled(self):
+        """
+        the code object for that step
+        """
+        if self._compiled is None:
+            self._compiled = compile(self.code, f"<{type(self).__name__}>",
+                                     'exec' if self.statement else 'eval')
+        return self._compiled
+
+
+    def run(self, instance, klass):
+        """
+        runs that step with INSTANCE and CLASS bound to these objects;
+        returns the value of an expression, or None for a statement
+        """
+        namespace = {'INSTANCE': instance, 'CLASS': klass}
+        # exec or eval, whether it's a statement or an expression
+        return (exec if self.statement else eval)(self.compiled(), namespace)
+
+
 class ClassStatement(ClassExpression):
     """
     a shortcut to create statements
@@ -139,6 +193,42 @@ class ClassStatement(ClassExpression):
     def __init__(self, code):
         ClassExpression.__init__(self, code, True)
 
+
+class MethodCall(ClassExpression):
+    """
+    a step that calls a method on INSTANCE with an Args instance;
+    unlike a ClassExpression, this does not involve compiling any code,
+    which matters with generated scenarios, see ExerciseClassFuzz
+
+    the arguments are deep-copied on each call
+    """
+    def __init__(self, methodname, args=None):
+        self.methodname = methodname
+        self.args = args if args is not None else Args()
+        ClassExpression.__init__(
+            self, f"INSTANCE.{methodname}({', '.join(self.args.tokens())})")
+
+
+    def run(self, instance, klass):
+        return self.args.clone('deep').call_obj(instance, self.methodname)
+
+
+def _steps(expressions):
+    return [ClassExpression(exp) if isinstance(exp, str) else exp
+            for exp in expressions]
+
+
+class ScenarioBranch:
+    """
+    a branch in a tree of scenarios, see ClassScenario;
+    made of steps, and optionally of sub-branches
+    """
+
+    def __init__(self, *expressions, branches=()):
+        self.steps = _steps(expressions)
+        self.branches = list(branches)
+
+
 ##########
 class ClassScenario:
     """
@@ -164,13 +254,33 @@ class ClassScenario:
       both the reference class and the student's class
       and the results compared with == 
       (unless the validate method is redefined on the Exercise class)
+
+    Scenarios that share a long common prefix can be written as a tree,
+    using branches - a list of ScenarioBranch objects; the exercise then
+    has one scenario per leaf - see leaves() - and the common steps
+    are run only once, the other leaves starting from a copy
+    of the student object at the branching point:
+      ClassScenario(
+          Args(),
+          "INSTANCE.incoming(1)",
+          "INSTANCE.incoming(2)",
+          branches=[
+              ScenarioBranch("INSTANCE.outgoing()"),
+              ScenarioBranch("len(INSTANCE)", "INSTANCE.incoming(3)"),
+          ])
     """
 
-    def __init__(self, init_args, *expressions):
+    def __init__(self, init_args, *expressions, branches=()):
         self.init_args = init_args
-        def step(exp):
-            return ClassExpression(exp) if isinstance(exp, str) else exp
-        self.steps = [step(exp) for exp in expressions]
+        self.steps = _steps(expressions)
+        self.branches = list(branches)
+        # for a leaf of a tree: the depth where to take copies of the
+        # student object, and a tuple (depth, index) that tells that
+        # the first depth steps are shared with the scenario at index
+        self.fork_depths = set()
+        self.resume_from = None
+        # an optional message, shown above the steps in the correction
+        self.note = None
         if not isinstance(self.init_args, Args):
             print(f"ERROR ClassScenario first parameter needs to be an Args instance")
         for index, step in enumerate(self.steps, 1):
@@ -178,6 +288,235 @@ class ClassScenario:
                 print(f"ERROR ClassScenario, step #{index}, needs to be a ClassExpression instance")
 
 
+    def leaves(self, start=0):
+        """
+        the list of linear scenarios, one per leaf of the tree,
+        in depth-first order; start is the index of the first one
+        in the exercise
+
+        a scenario with no branches is its own only leaf
+        """
+        if not self.branches:
+            return [self]
+        leaves = []
+        def walk(node, prefix, forks, resume_from):
+            steps = prefix + node.steps
+            if not node.branches:
+                leaf = ClassScenario(self.init_args, *steps)
+                leaf.fork_depths = set(forks)
+                leaf.resume_from = resume_from
+                leaves.append(leaf)
+                return
+            forks = forks + [len(steps)]
+            first = start + len(leaves)
+            for index, branch in enumerate(node.branches):
+                walk(branch, steps, forks,
+                     resume_from if index == 0 else (len(steps), first))
+        walk(self, [], [], None)
+        return leaves
+
+
+    def fingerprint(self):
+        """
+        a digest of the scenario contents, used to spot changes;
+        returns None if the init args can't be pickled
+        """
+        init = self.init_args.fingerprint()
+        if init is None:
+            return None
+        steps = [(step.code, step.statement) for step in self.steps]
+        return hashlib.sha1(repr((init, steps)).encode()).hexdigest()
+
+
+def reference_steps(ref_class, scenario, copy_mode):
+    """
+    runs the solution on a scenario, and yields tuples (expected, ref_exc):
+    first for the creation of the object - expected is then the object itself -
+    and then for each step - for a statement, expected is the repr()
+    of the object after the step
+
+    an exception raised by the solution is yielded as the expected result,
+    with ref_exc set; nothing more is yielded if the object can't be created
+    """
+    args = scenario.init_args.clone(copy_mode)
+    try:
+        REF = args.init_obj(ref_class)
+    except Exception as exc:
+        yield exc, True
+        return
+    yield REF, False
+    for step in scenario.steps:
+        try:
+            result = step.run(REF, ref_class)
+            if step.statement:
+                result = repr(REF)
+        except Exception as exc:
+            yield exc, True
+            continue
+        yield result, False
+
+
+def record_transcript(ref_class, scenario, copy_mode):
+    """
+    the results of reference_steps(), recorded as a list of tuples
+    (pickled expected, ref_exc)
+
+    pickling makes a snapshot of each result, that the next steps can't alter,
+    and that can be shipped to a worker process or stored in a bundle;
+    an exception is raised if a result can't be pickled
+    """
+    return [(pickle.dumps(expected), ref_exc)
+            for (expected, ref_exc) in reference_steps(ref_class, scenario, copy_mode)]
+
+
+def replay_transcript(transcript):
+    return ((pickle.loads(blob), ref_exc) for (blob, ref_exc) in transcript)
+
+
+def _snapshot(value):
+    """
+    a copy of a result, so that it is rendered as it was
+    even if the next steps modify it
+    """
+    try:
+        return copy.deepcopy(value)
+    except Exception:
+        return value
+
+
+def _error_message(exc):
+    return f"Exception {type(exc)}: {exc}"
+
+
+def run_scenario(exercise, stu_class, scenario,   # pylint: disable=r0913
+                 fail_fast=False, print_exceptions=False, transcript=None,
+                 snapshots=None):
+    """
+    runs one scenario on both the solution and the student class,
+    with no rendering; the settings are taken from exercise
+
+    when transcript is provided - see record_transcript() - the solution
+    is not run, and its results are taken from there instead
+
+    snapshots is used with trees of scenarios, see ClassScenario.leaves();
+    it is a dict depth -> snapshot, that is filled with copies of the student
+    object at the depths in scenario.fork_depths; when the scenario shares its
+    first steps with a previous one, and a snapshot is available at that depth,
+    the scenario starts from there instead of from scratch; this requires
+    a transcript, as the solution side is not snapshotted
+
+    returns a list of StepResult objects, the first one being about the
+    creation of both objects, and then one per step that was run;
+    the last one has its error set if the scenario could not complete
+
+    this is a plain function so that it can be shipped to a worker process
+    """
+    resume = None
+    if snapshots is not None:
+        if scenario.resume_from is not None and transcript is not None:
+            resume = snapshots.get(scenario.resume_from[0])
+        # the deeper snapshots were taken on another branch
+        depth = -1 if resume is None else resume[0]
+        for key in [key for key in snapshots if key > depth]:
+            del snapshots[key]
+    if resume is not None:
+        references = replay_transcript(transcript[resume[0]+1:])
+    elif transcript is not None:
+        references = replay_transcript(transcript)
+    else:
+        references = reference_steps(exercise.solution, scenario, exercise.copy_mode)
+    step_results = []
+    try:
+        with limited(exercise.scenario_timeout):
+            _run_steps(exercise, stu_class, scenario, references, step_results,
+                       fail_fast, print_exceptions, resume, snapshots)
+    except LimitExceeded as exc:
+        step_results.append(StepResult(None, None, False, error=str(exc)))
+    return step_results
+
+
+def _take_snapshot(scenario, snapshots, depth, STU, step_results):
+    if snapshots is None or depth not in scenario.fork_depths:
+        return
+    try:
+        snapshots[depth] = (depth, copy.deepcopy(STU), list(step_results))
+    except LimitExceeded:
+        raise
+    except Exception:
+        # the scenarios that fork from here will start from scratch
+        pass
+
+
+def _run_steps(exercise, stu_class, scenario, references,   # pylint: disable=r0913, r0914
+               step_results, fail_fast, print_exceptions, resume, snapshots):
+    ref_class = exercise.solution
+    if resume is not None:
+        depth, STU, prefix = resume
+        STU = copy.deepcopy(STU)
+        # the results of the shared steps, whose timings were already accounted for
+        step_results.extend(StepResult(result.expected, result.obtained, result.ok,
+                                       error=result.error)
+                            for result in prefix)
+    else:
+        depth = 0
+        timings = {}
+        with timed(timings, 'clone'):
+            stu_args = scenario.init_args.clone(exercise.copy_mode)
+
+        # initialize both objects
+        try:
+            with timed(timings, 'solution'):
+                REF, ref_exc = next(references)
+            if ref_exc:
+                raise REF
+            with timed(timings, 'student'), limited(exercise.timeout, exercise.memory_limit):
+                STU = stu_args.init_obj(stu_class)
+
+            if not exercise.check_init:
+                ref_repr = stu_repr = '--unchecked--'
+                is_ok = True
+            else:
+                with timed(timings, 'validate'):
+                    ref_repr, stu_repr = repr(REF), repr(STU)
+                    is_ok = exercise.validate(REF, STU, ref_class, stu_class)
+        except Exception as exc:
+            if print_exceptions:
+                import traceback
+                traceback.print_exc()
+            error = (str(exc) if isinstance(exc, LimitExceeded)
+                     else f"Exception {type(exc)} {exc}")
+            step_results.append(StepResult(None, None, False, error=error, timings=timings))
+            return
+        step_results.append(StepResult(ref_repr, stu_repr, is_ok, timings=timings))
+        _take_snapshot(scenario, snapshots, depth, STU, step_results)
+
+    # other steps of that scenario
+    for depth, step in enumerate(scenario.steps[depth:], depth+1):
+        if fail_fast and not all(step_result.ok for step_result in step_results):
+            return
+        timings = {}
+        with timed(timings, 'solution'):
+            ref_result, ref_exc = next(references)
+        try:
+            with timed(timings, 'student'), limited(exercise.timeout, exercise.memory_limit):
+                stu_result = step.run(STU, stu_class)
+            with timed(timings, 'validate'):
+                # with a statement, compare the objects afterwards
+                if step.statement:
+                    stu_result = repr(STU)
+                is_ok = (not ref_exc
+                         and exercise.validate(ref_result, stu_result, ref_class, stu_class))
+        except Exception as exc:
+            # when the solution raises an exception, so should the student code
+            is_ok = ref_exc and type(exc) is type(ref_result)
+            stu_result = exc if isinstance(exc, LimitExceeded) else _error_message(exc)
+        if ref_exc:
+            ref_result = _error_message(ref_result)
+        step_results.append(StepResult(_snapshot(ref_result), _snapshot(stu_result),
+                                       bool(is_ok), timings=timings))
+        _take_snapshot(scenario, snapshots, depth, STU, step_results)
+
+
 ##########
 class ExerciseClass:                                    # pylint: disable=r0902
     """
@@ -193,6 +532,29 @@ class ExerciseClass:                                    # pylint: disable=r0902
     given to students who do not yet know how to write their own repr();
     of course this assumes to not use a statement in the scenario, as that
     would still trigger repr()
+
+    timeout (in seconds) and memory_limit (in bytes) apply to each step
+    of the student code - object creation included; see limits.py
+
+    with stream=True, correction() displays its table right away,
+    and fills it one scenario at a time
+
+    the time spent in each step is measured, and totalled in the json logs;
+    show_timings=True adds a column with the timings of each step
+
+    scenario_timeout (in seconds) applies to each scenario as a whole
+
+    with executor='process' the scenarios are run in parallel in a pool
+    of worker processes - of size max_workers, defaults to the number of cores;
+    a student class that crashes its worker only fails the scenario at hand;
+    this requires the classes, the scenarios, and the results, to be picklable,
+    otherwise the scenarios run in the kernel
+
+    the solution side of each scenario is recorded once into a transcript,
+    that is reused across corrections and in example(), so that only the
+    student code runs on a submission; this assumes the solution is
+    deterministic, pass cache_expected=False otherwise; transcripts can
+    also be stored in a bundle, see the nbae-precompute command
     """
 
     def __init__(self, solution, scenarios,                     # pylint: disable=r0913
@@ -208,11 +570,21 @@ class ExerciseClass:                                    # pylint: disable=r0902
                  font_size=default_font_size,
                  header_font_size=default_header_font_size,
                  check_init=True,
+                 timeout=None,
+                 memory_limit=None,
+                 stream=False,
+                 show_timings=False,
+                 executor=None,
+                 max_workers=None,
+                 scenario_timeout=None,
+                 cache_expected=True,
                  ):
         # the 'official' solution
         self.solution = solution
-        # the inputs - actually Scenario instances
-        self.scenarios = scenarios
+        # the inputs - actually Scenario instances, trees are flattened
+        self.scenarios = []
+        for scenario in scenarios:
+            self.scenarios.extend(scenario.leaves(start=len(self.scenarios)))
         # how to copy args
         self.copy_mode = copy_mode
         # how many examples
@@ -221,7 +593,7 @@ class ExerciseClass:                                    # pylint: disable=r0902
         # current object in the scenarios
         self.obj_name = obj_name
         # 
-        self.result_renderer = result_renderer or Renderer()
+        self.result_renderer = result_renderer or SizeAwareRenderer()
         # header names 
         self.column_headers = column_headers or default_column_headers
         #
@@ -229,156 +601,324 @@ class ExerciseClass:                                    # pylint: disable=r0902
         self.font_size = font_size
         # see above
         self.check_init = check_init
+        # bound the student code
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        # show the scenarios as they come
+        self.stream = stream
+        # an extra column with the time spent on each step
+        self.show_timings = show_timings
+        # where to run the scenarios
+        self.executor = check_executor(executor)
+        self.max_workers = max_workers
+        self.scenario_timeout = scenario_timeout
+        # remember the results of the solution
+        self.cache_expected = cache_expected
+        self._cache = ReferenceCache()
+        self._cache_solution = solution
+        # bundles are only relevant for the original solution
+        self._use_bundles = True
         # computed
         self.name = solution.__name__
         
 
-    def correction(self, stu_class, print_exceptions=False): # pylint: disable=r0914, r0915
+    def correction(self, stu_class, print_exceptions=False, # pylint: disable=r0914
+                   fail_fast=False, stream=None):
+        """
+        with fail_fast=True, the correction stops at the first failing step,
+        and only mentions how many scenarios were skipped
 
-        overall = True
-        ref_class = self.solution
+        with stream=True, the table is displayed right away and
+        filled one scenario at a time; in that case nothing is returned
+        """
+        from ipywidgets import GridBox, Layout
+
+        stream = self.stream if stream is None else stream
+        passed, failed = 0, 0
 
         headers_props = {'font-size': self.header_font_size}
         body_props = {'font-size': self.font_size}
-        contents = []
-
-        for index, scenario in enumerate(self.scenarios, 1):
-
-            classes = ['cell']
-
-            init_args = scenario.init_args
-                                 
+        contents = [CssContent(CSS)]
+        # the timings of each step
+        all_timings = []
+
+        headers = list(zip(self.column_headers, column_span_classes))
+        columns = 'max-content 1fr 1fr max-content'
+        if self.show_timings:
+            headers = list(zip([*self.column_headers, timings_column_header],
+                               timings_column_span_classes))
+            columns += ' max-content'
+        gridbox_layout  = Layout(grid_template_columns=columns, max_width="100%")
+        grid = GridBox(layout=gridbox_layout).add_class("nbae-cls")
+        if stream:
+            from IPython.display import display
+            display(grid)
+
+        runs = self._scenario_runs(stu_class, fail_fast, print_exceptions)
+        for index, (scenario, step_results) in enumerate(runs, 1):
 
             # header for scenario
             contents += [TextContent(x.format(n=index))
                          .add_css_properties(headers_props)
                          .add_class('header')
                          .add_classes(span_classes)
-                        for (x, span_classes) in zip(self.column_headers, 
-                                                     column_span_classes)]
+                        for (x, span_classes) in headers]
         
             call_renderer = CallRenderer(show_function=self.name, 
                                          prefix=f"{self.obj_name} = ",
                                          postfix=f"; repr({self.obj_name})") 
-            init_rendered = call_renderer.render(Call(None, init_args))
-            # clone args for both usages
-            ref_args = init_args.clone(self.copy_mode)
-            stu_args = init_args.clone(self.copy_mode)
-                
-            # initialize both objects
-            try:
-                # initialize both objects
-                REF = ref_args.init_obj(ref_class)  
-                STU = stu_args.init_obj(stu_class)
-                
-                if not self.check_init:
-                    ref_repr = stu_repr = '--unchecked--'
-                    is_ok = True
+            # the steps shared with a previous scenario are not shown again
+            shared, note = 0, scenario.note
+            if scenario.resume_from is not None:
+                depth, origin = scenario.resume_from
+                shared = depth + 1
+                note = f"reprend le scénario {origin+1} après {depth} étape(s)"
+            if note:
+                contents.append(
+                    TextContent(note)
+                    .add_classes(['cell', 'note',
+                                  'span-1-to-5' if self.show_timings else 'span-1-to-4'])
+                    .add_css_properties(body_props))
+            # first step is __init__
+            for step_index, step_result in enumerate(step_results, 1):
+                timings = step_result.timings
+                all_timings.append(timings)
+                if step_index <= shared and step_result.ok:
+                    continue
+                classes = ['cell']
+                if step_index == 1:
+                    call_content = call_renderer.render(Call(None, scenario.init_args))
                 else:
-                    ref_repr, stu_repr = repr(REF), repr(STU)
-                    is_ok = self.validate(REF, STU, ref_class, stu_class)
-                    if not is_ok:
-                        overall = False
-                # render that run
-                result_content = ResultContent(is_ok)
+                    step = scenario.steps[step_index-2]
+                    step_text = step.replace(self.obj_name, self.solution.__name__)
+                    if step.statement:
+                        step_text += f"; {self.obj_name}"
+                    call_content = TextContent(step_text).set_is_code(True)
+                    if step_index % 2 == 0:
+                        classes.append('even')
+                call_content.add_classes(classes).add_css_properties(body_props)
+
+                if step_result.error is not None:
+                    contents.append(call_content)
+                    contents.append(TextContent(step_result.error)
+                                    .add_classes(classes)
+                                    .add_class('ko')
+                                    .add_class('span-2-to-3')
+                                    .add_css_properties(body_props))
+                    contents.append(ResultContent(False)
+                                    .add_css_properties(body_props))
+                else:
+                    with timed(timings, 'render'):
+                        result_content = ResultContent(step_result.ok)
+                        row = [
+                            call_content,
+                            self.result_renderer.render(step_result.expected)
+                            .add_classes(classes).add_class('ok')
+                            .add_css_properties(body_props),
+                            self.result_renderer.render(step_result.obtained)
+                            .add_classes(classes)
+                            .add_class(result_content.the_class())
+                            .add_css_properties(body_props),
+                            result_content
+                            .add_classes(classes)
+                            .add_css_properties(body_props),
+                        ]
+                        for content in row:
+                            content.widget()
+                    contents.extend(row)
+                if self.show_timings:
+                    contents.append(TimingsContent(timings)
+                                    .add_classes(classes)
+                                    .add_css_properties(body_props))
+
+            # show this scenario right away
+            if stream:
+                grid.children += tuple(content.widget() for content in contents)
+                contents = []
+
+            if all(step_result.ok for step_result in step_results):
+                passed += 1
+            else:
+                failed += 1
+                if fail_fast:
+                    runs.close()
+                    break
+
+        # the runs may include generated scenarios, see ExerciseClassFuzz
+        skipped = max(len(self.scenarios) - passed - failed, 0)
+        if skipped:
+            contents.append(TextContent(f"fail fast: {skipped} more scenario(s) skipped")
+                            .add_classes(['cell', 'skipped', 'span-1-to-4'])
+                            .add_css_properties(body_props))
 
-                contents.append(init_rendered
-                                .add_classes(classes)
-                                .add_css_properties(body_props))
-                contents.append(self.result_renderer.render(ref_repr)
-                                .add_classes(classes).add_class('ok')
-                                .add_css_properties(body_props))
-                contents.append(self.result_renderer.render(stu_repr)
-                                .add_classes(classes)
-                                .add_class(result_content.the_class())
-                                .add_css_properties(body_props))
-                contents.append(result_content
-                                .add_classes(classes)
-                                .add_css_properties(body_props))
-                
-            except Exception as exc:
-                if print_exceptions:
-                    import traceback
-                    traceback.print_exc()
-                error = f"Exception {type(exc)} {exc}"
-                contents.append(init_rendered
-                                .add_classes(classes)
-                                .add_css_properties(body_props))
-                contents.append(TextContent(error)
-                                .add_classes(classes)
-                                .add_class('ko')
-                                .add_class('span-2-to-3')
-                                .add_css_properties(body_props))
-                contents.append(ResultContent(False)
-                                .add_css_properties(body_props))
-                overall = False
-                continue
+        overall = not failed
+        log_correction(self.name, overall)
+        log2_correction(self.name, success=overall,
+                        passed=passed, failed=failed, skipped=skipped,
+                        timings=total_timings(all_timings, digits=6))
 
-            # other steps of that scenario; first step was __init__
-            for step_index, step in enumerate(scenario.steps, 2):
-                code_ref = step.replace("REF", "ref_class")
-                code_stu = step.replace("STU", "stu_class")
-                display = step.replace(self.obj_name, ref_class.__name__)
-                if step.statement:
-                    display += f"; {self.obj_name}"
+        grid.children += tuple(content.widget() for content in contents)
+        return None if stream else grid
 
-                classes = ['cell']
-                if step_index % 2 == 0:
-                    classes.append('even')
-                # the function to use to run code, whether it's a statement
-                # or an expression; in the former case of course, there is no need 
-                # to cmpare results as they are None, but that's not important
-                code_runner = exec if step.statement else eval
-                ref_result = code_runner(code_ref)
-                try:
-                    stu_result = code_runner(code_stu)
-                    if step.statement:
-                        stu_result = repr(STU)
-                        ref_result = repr(REF)
-                    is_ok = self.validate(ref_result, stu_result, ref_class, stu_class)
-                    if not is_ok:
-                        overall = False
-                    result_content = ResultContent(is_ok)
 
+    def _scenario_runs(self, stu_class, fail_fast, print_exceptions):
+        """
+        iterates over the scenarios, in order, and yields tuples
+        (scenario, step_results) - see run_scenario()
+        """
+        if self.executor == 'process':
+            yield from self._scenario_runs_in_processes(stu_class, fail_fast,
+                                                        print_exceptions)
+            return
+        # the copies of the student objects, in trees of scenarios
+        snapshots = {}
+        for index, scenario in enumerate(self.scenarios):
+            yield scenario, run_scenario(self, stu_class, scenario,
+                                         fail_fast, print_exceptions,
+                                         self._transcript(index, scenario),
+                                         snapshots)
+
+
+    def _scenario_runs_in_processes(self, stu_class, fail_fast, print_exceptions):
+        """
+        same as _scenario_runs, but each scenario runs in a worker process
+
+        when a worker dies, the scenarios that were pending are run again,
+        one at a time in a fresh process, so as to spot the culprit
+        """
+        for obj in (stu_class, self):
+            exc = unpicklable(obj)
+            if exc is not None:
+                print(f"WARNING: {self.name}: cannot ship {obj} to worker processes "
+                      f"({type(exc).__name__}: {exc}) - running serially")
+                for index, scenario in enumerate(self.scenarios):
+                    yield scenario, run_scenario(self, stu_class, scenario,
+                                                 fail_fast, print_exceptions,
+                                                 self._transcript(index, scenario))
+                return
+
+        # the transcripts are recorded in the kernel, so they can be cached
+        transcripts = [self._transcript(index, scenario)
+                       for (index, scenario) in enumerate(self.scenarios)]
+        pool = process_pool(self.max_workers)
+        try:
+            futures = [pool.submit(run_scenario, self, stu_class, scenario,
+                                   fail_fast, print_exceptions, transcript)
+                       for (scenario, transcript) in zip(self.scenarios, transcripts)]
+            for index, (scenario, transcript, future) \
+                    in enumerate(zip(self.scenarios, transcripts, futures), 1):
+                try:
+                    step_results = future.result()
+                except BrokenProcessPool:
+                    step_results = self._run_alone(stu_class, scenario, fail_fast,
+                                                   print_exceptions, transcript)
+                # the step results could not be pickled
                 except Exception as exc:
-                    result_content = ResultContent(False)
-                    overall = False
-                    stu_result = f"Exception {type(exc)}: {exc}"
-                    if step.statement:
-                        ref_result = repr(REF)
+                    print(f"WARNING: {self.name}: scenario #{index} "
+                          f"could not be run in a worker process "
+                          f"({type(exc).__name__}: {exc}) - running it in the kernel")
+                    step_results = run_scenario(self, stu_class, scenario,
+                                                fail_fast, print_exceptions, transcript)
+                yield scenario, step_results
+        finally:
+            # when the caller stops early, no need to run the pending scenarios
+            pool.shutdown(cancel_futures=True)
+
+
+    def _run_alone(self, stu_class, scenario,         # pylint: disable=r0913
+                   fail_fast, print_exceptions, transcript):
+        with process_pool(1) as pool:
+            try:
+                return pool.submit(run_scenario, self, stu_class, scenario,
+                                   fail_fast, print_exceptions, transcript).result()
+            except BrokenProcessPool:
+                return [StepResult(None, None, False,
+                                   error="the worker process died")]
 
-                contents.append(TextContent(display)
-                                .set_is_code(True)
-                                .add_classes(classes)
-                                .add_css_properties(body_props))
-                contents.append(self.result_renderer.render(ref_result)
-                                .add_classes(classes).add_class('ok')
-                                .add_css_properties(body_props))
-                contents.append(self.result_renderer.render(stu_result)
-                                .add_classes(classes)
-                                .add_class(result_content.the_class())
-                                .add_css_properties(body_props))
-                contents.append(result_content
-                                .add_classes(classes)
-                                .add_css_properties(body_props))
 
-        log_correction(self.name, overall)
-        # xxx would make sense to expose how many examples were right or wrong
-        log2_correction(self.name, success=overall)
+    # caching the solution side
+    def _transcript(self, index, scenario):
+        """
+        the transcript for that scenario - see record_transcript() -
+        or None if it can't be recorded or cached
+        """
+        if not self.cache_expected:
+            return None
+        # the solution may have been changed on the fly
+        if self._cache_solution is not self.solution:
+            self.invalidate_cache()
+            self._cache_solution = self.solution
+            self._use_bundles = False
+        fingerprint = scenario.fingerprint()
+        if fingerprint is None:
+            return None
+        entry = self._cache.get(index, fingerprint)
+        if entry is None and self._use_bundles:
+            found = bundle_lookup(self.bundle_key(), index, fingerprint)
+            if found is not None:
+                transcript, _ = found
+                entry = self._cache.store(index, fingerprint, transcript=transcript)
+        if entry is None:
+            try:
+                transcript = record_transcript(self.solution, scenario, self.copy_mode)
+            except Exception:
+                # some results can't be pickled
+                return None
+            entry = self._cache.store(index, fingerprint, transcript=transcript)
+        return entry['transcript']
 
-        contents.append(CssContent(CSS))
 
-        gridbox_layout  = Layout(grid_template_columns = 'max-content 1fr 1fr max-content',
-                                 max_width="100%")
-        grid = GridBox([content.widget() for content in contents],
-                       layout=gridbox_layout).add_class("nbae-cls")
-        return grid
+    def invalidate_cache(self, index=None):
+        """
+        forget about the recorded transcripts,
+        either for all scenarios, or for the one at that index
+        """
+        self._cache.invalidate(index)
+
+
+    def bundle_key(self):
+        """
+        the key used to store transcripts in a bundle; several exercises
+        often share the same solution with different scenarios
+        """
+        solution = self.solution
+        scenarios = hashlib.sha1(repr([scenario.fingerprint() for scenario in self.scenarios])
+                                 .encode()).hexdigest()[:8]
+        return (f"{self.name}:{getattr(solution, '__module__', '')}"
+                f".{getattr(solution, '__qualname__', '')}:{scenarios}")
+
+
+    def expected_results(self):
+        """
+        records the transcripts of all scenarios, regardless of the cache
+
+        yields tuples (fingerprint, transcript, False), like
+        ExerciseFunction.expected_results() does, for storing in a bundle;
+        the fingerprint is None when the transcript can't be recorded
+        """
+        for index, scenario in enumerate(self.scenarios, 1):
+            try:
+                transcript = record_transcript(self.solution, scenario, self.copy_mode)
+            except Exception as exc:
+                print(f"WARNING: {self.name}: scenario #{index} can't be recorded "
+                      f"({type(exc).__name__}: {exc})")
+                yield None, None, False
+                continue
+            yield scenario.fingerprint(), transcript, False
+
+
+    def __getstate__(self):
+        # no need to ship the cache to worker processes
+        state = dict(vars(self))
+        state['_cache'] = ReferenceCache()
+        return state
 
 
     def example(self):                                  # pylint: disable=r0914
         """
         display a table with example scenarios
         """
+        from ipywidgets import GridBox, Layout
         ref_class = self.solution
 
         headers_props = {'font-size': self.header_font_size}
@@ -401,26 +941,29 @@ class ExerciseClass:                                    # pylint: disable=r0902
                 for (x, span_classes) in zip(self.column_headers,
                                              example_column_span_classes)]
 
+            # the solution side, recorded or not
+            transcript = self._transcript(index-1, scenario)
+            references = (reference_steps(ref_class, scenario, self.copy_mode)
+                          if transcript is None else replay_transcript(transcript))
+
             # object construction
-            init_args = scenario.init_args.clone(self.copy_mode)
-            SAMPLE = init_args.init_obj(ref_class)      # pylint: disable=unused-variable
+            sample, ref_exc = next(references)
+            sample = _error_message(sample) if ref_exc else repr(sample)
 
             call_renderer = CallRenderer(show_function=self.name, 
                                          prefix=f"{self.obj_name} = ",
                                          postfix=f"; repr({self.obj_name})") 
-            init_rendered = call_renderer.render(Call(None, init_args))
+            init_rendered = call_renderer.render(Call(None, scenario.init_args))
             contents.append(init_rendered
                             .add_classes(classes)
                             .add_css_properties(body_props))
-            contents.append(self.result_renderer.render(repr(SAMPLE))
+            contents.append(self.result_renderer.render(sample)
                             .add_classes(classes)
                             .add_css_properties(body_props))
 
-            for step_index, step in enumerate(scenario.steps, 2):
+            for step_index, (step, (ref_result, ref_exc)) \
+                    in enumerate(zip(scenario.steps, references), 2):
                 display = step.replace(self.obj_name, ref_class.__name__)
-                code = step.replace("SAMPLE", "ref_class")
-                code_runner = exec if step.statement else eval
-                ref_result = code_runner(code)
                 classes = ['cell', 'example']
                 if step_index % 2 == 0:
                     classes.append('even')
@@ -428,7 +971,8 @@ class ExerciseClass:                                    # pylint: disable=r0902
                 ### display
                 if step.statement:
                     display += f"; repr({self.obj_name})"
-                    ref_result = repr(SAMPLE)
+                if ref_exc:
+                    ref_result = _error_message(ref_result)
                 contents.append(TextContent(display)
                                 .set_is_code(True)
                                 .add_classes(classes)
@@ -5,13 +5,18 @@
 ############################################################
 # the low level interface - used to be used directly in the first exercises
 
-from ipywidgets import GridBox, Layout
-
-from .content import TextContent, CssContent, ResultContent
+from .content import TextContent, CssContent, ResultContent, TimingsContent
 from .callrenderer import Call, CallRenderer
-from .renderer import Renderer
+from .renderer import SizeAwareRenderer
 from .helpers import default_font_size, default_header_font_size
+from .helpers import timed
 from .storage import log_correction, log2_correction
+from .parallel import check_executor, process_pool, unpicklable
+from .cache import ReferenceCache
+from .bundle import bundle_lookup
+from .limits import limited
+from .results import DatasetResult, Evaluation, total_timings
+from .validation import Mismatch
 
 
 DEBUG = False
@@ -32,6 +37,8 @@ default_column_headers_no_function_name = (
 column_span_classes = (
     "", "", "span-3-to-4",
 )
+# the extra column with show_timings=True
+timings_column_header = "durées"
 
 ###
 CSS = """
@@ -54,6 +61,15 @@ CSS = """
 .nbae-fun .span-3-to-4 {
     grid-column: 3 / span 2;
 }
+.nbae-fun .span-1-to-3 {
+    grid-column: 1 / span 3;
+}
+.nbae-fun .span-1-to-4 {
+    grid-column: 1 / span 4;
+}
+.nbae-fun .skipped {
+    font-style: italic;
+}
 div.nbae-fun pre {
     padding: 0px;
     line-height: 1.15;
@@ -94,8 +110,79 @@ div.nbae-fun .cell span {
 .nbae-fun div.widget-html-content {
     display: flex;
 }
+.nbae-fun .limit-exceeded {
+    font-style: italic;
+}
+.nbae-fun .mismatch {
+    font-style: italic;
+    color: #a00;
+}
+.nbae-fun .timings {
+    font-size: 80%;
+    color: #666;
+}
 """
 
+####################
+class InvalidSubmission(Exception):
+    """
+    raised by student_solution() when the students submission
+    can't be turned into a function, e.g. a regexp that does not compile
+    """
+
+
+def run_function(function, dataset, timeout=None, memory_limit=None):
+    """
+    call function on dataset - that should be already cloned
+    optionnally with a timeout and a memory limit, see limits.py
+
+    exceptions are caught and returned as the result, so the returned value
+    is a tuple (result, is_exc) where is_exc is a boolean
+    """
+    try:
+        with limited(timeout, memory_limit):
+            return dataset.call(function, debug=DEBUG), False
+    except Exception as exc:
+        return exc, True
+
+
+def run_dataset(solution, student_function, dataset, copy_mode, # pylint: disable=r0913
+                timeout=None, memory_limit=None):
+    """
+    run both the solution and the student function on one dataset
+
+    each function gets its own clone of the dataset, and the returned value
+    is a DatasetResult instance, whose index, dataset and ok attributes
+    are left for the caller to fill
+
+    the limits only apply to the student code
+
+    solution can be None when the expected result is already known,
+    in which case expected is None
+
+    this is a plain function so that it can be shipped to a worker process
+    """
+    timings = {}
+    # always clone all inputs - except when there is no solution to run
+    with timed(timings, 'clone'):
+        if copy_mode != 'tee':
+            student_dataset = dataset.clone(copy_mode)
+            ref_dataset = dataset.clone(copy_mode) if solution is not None else None
+        else:
+            student_dataset, ref_dataset = dataset.copy_for_tee('tee')
+
+    # run both codes
+    expected, ref_exc = None, False
+    if solution is not None:
+        with timed(timings, 'solution'):
+            expected, ref_exc = run_function(solution, ref_dataset)
+    with timed(timings, 'student'):
+        obtained, stu_exc = run_function(student_function, student_dataset,
+                                         timeout, memory_limit)
+
+    return DatasetResult(expected, ref_exc, obtained, stu_exc, timings=timings)
+
+
 ####################
 class ExerciseFunction:                                           # pylint: disable=r0902
     """The class for an exercise where students are asked to write a
@@ -114,6 +201,10 @@ class ExerciseFunction:                                           # pylint: disa
     student function, and compare the results using '==' to produce a
     table of green or red cells.
 
+    The same logic is available without any rendering, through the
+    'evaluate' method that returns an Evaluation object - see results.py;
+    this is suitable for use outside of a notebook, e.g. for grading.
+
     The class provides a few other utility methods, notably 'example'
     that can be used in the students notebook to show the expected
     result for some or all of the inputs.
@@ -123,7 +214,35 @@ class ExerciseFunction:                                           # pylint: disa
     it means that these need to be copied before any call is made. By
     default the copy is a deep copy, but for some corner cases it can
     be required to use shallow copy instead; in this case just pass
-    copy_mode='shallow' to the constructor here.
+    copy_mode='shallow' to the constructor here. With copy_mode='auto',
+    the arguments that are immutable - like strings, or tuples of numbers -
+    are shared instead of being deep-copied, which saves time on large inputs.
+
+    The student code can be bounded, on each dataset, with a timeout
+    in seconds and a memory_limit in bytes; a dataset that exceeds
+    these limits is aborted and rendered as such - see limits.py.
+
+    With stream=True, correction() displays its table right away, and
+    fills it one row at a time, as the datasets get corrected.
+
+    The time spent on each dataset - cloning the inputs, running the solution
+    and the student code, validating and rendering - is measured; it is
+    exposed in the timings attribute of the results, totalled in the json logs,
+    and shown in an extra column with show_timings=True.
+
+    By default all datasets are run in the kernel, one after the other;
+    with executor='process' the datasets are instead fanned out to a pool
+    of worker processes - of size max_workers, defaults to the number of cores;
+    the solution, the student function, the datasets and the results all need
+    to be picklable for that to work, the datasets that can't be shipped
+    to a worker are run in the kernel as usual.
+
+    The results of the solution - and their rendering - are cached, so that
+    a correction only runs the student code on the datasets that were seen
+    before; this assumes the solution is deterministic, pass cache_expected=False
+    otherwise; use invalidate_cache() after changing the renderers.
+    These results can also be computed ahead of time and shipped
+    as a bundle, see the nbae-precompute command.
 
     In terms of rendering, an ExerciseFunction object requires 2 renderer objects
 
@@ -133,7 +252,8 @@ class ExerciseFunction:                                           # pylint: disa
       that works on `Call` instances, and that returns a `Content` object.
     * result_renderer works similarly, it is used to render the results of the function
       calls in the internal columns of the output of correction(), and the rightmost
-      column of the output of example();
+      column of the output of example(); it defaults to a SizeAwareRenderer, that
+      only shows a preview of large results
 
     Typical uses of these 2 rendering attributes would be
 
@@ -147,7 +267,15 @@ class ExerciseFunction:                                           # pylint: disa
                  *,
                  copy_mode='deep',
                  nb_examples=1,
+                 # how to run
+                 executor=None,
+                 max_workers=None,
+                 cache_expected=True,
+                 timeout=None,
+                 memory_limit=None,
                  # how to render
+                 stream=False,
+                 show_timings=False,
                  call_renderer=None,
                  result_renderer=None,
                  #
@@ -164,9 +292,25 @@ class ExerciseFunction:                                           # pylint: disa
         self.copy_mode = copy_mode
         # how many examples
         self.nb_examples = nb_examples
+        # None or 'serial' to run in the kernel, or 'process'
+        self.executor = check_executor(executor)
+        self.max_workers = max_workers
+        # remember the results of the solution
+        self.cache_expected = cache_expected
+        self._cache = ReferenceCache()
+        self._cache_solution = solution
+        # bundles are only relevant for the original solution
+        self._use_bundles = True
+        # bound the student code
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        # show the rows as they come
+        self.stream = stream
+        # an extra column with the time spent on each dataset
+        self.show_timings = show_timings
         # renderers
         self.call_renderer = call_renderer or CallRenderer()
-        self.result_renderer = result_renderer or Renderer()
+        self.result_renderer = result_renderer or SizeAwareRenderer()
         # header names: at this point, just remember any data passed
         # it's too erly to compute the actual value, as show_function
         # could be turned off later on - see e.g. ExerciseRegexp
@@ -186,92 +330,331 @@ class ExerciseFunction:                                           # pylint: disa
             else default_column_headers_no_function_name)
 
 
-    def correction(self, student_function):             # pylint: disable=r0914
+    def student_solution(self, submission):             # pylint: disable=r0201
+        """
+        turns what the student submits into a function that can be
+        compared with the solution; for plain functions this is a no-op
+
+        raises InvalidSubmission if that can't be done, e.g. with a regexp
+        that does not compile; the correction then shows a single error row
+        """
+        return submission
+
+
+    def evaluate(self, student_function, fail_fast=False):
+        """
+        run the student code on all datasets, just like correction() does
+        but with no rendering nor logging
+
+        returns an Evaluation object
+        """
+        evaluation = self._new_evaluation()
+        try:
+            student_function = self.student_solution(student_function)
+        except InvalidSubmission as exc:
+            evaluation.error = str(exc)
+            return evaluation
+        for result, _ in self._evaluate(student_function, fail_fast):
+            evaluation.add(result)
+        return evaluation
+
+
+    def _new_evaluation(self):
+        return Evaluation(self.name, len(self.datasets))
+
+
+    def correction(self, student_function, fail_fast=False, stream=None):
         """
         colums should be a 3-tuple for the 3 columns widths
-        copy_mode can be either None, 'shallow', or 'deep' (default)
+        copy_mode can be either None, 'shallow', 'auto' or 'deep' (default)
         or 'tee' for generators
-        """
-        datasets = self.datasets
-        copy_mode = self.copy_mode
 
+        with fail_fast=True, the correction stops at the first failing dataset,
+        and only mentions how many datasets were skipped
+
+        with stream=True - defaults to the exercise's stream setting - the
+        table is displayed right away, and each row shows up as soon as its
+        dataset is done; in that case nothing is returned
+        """
+        from ipywidgets import GridBox, Layout
+
+        stream = self.stream if stream is None else stream
+        evaluation = self._new_evaluation()
+        try:
+            student_function = self.student_solution(student_function)
+            runs = self._evaluate(student_function, fail_fast)
+        except InvalidSubmission as exc:
+            evaluation.error = str(exc)
+            runs = ()
         #
         headers_props = {'font-size': self.header_font_size}
         body_props = {'font-size': self.font_size}
+        headers = list(zip(self.column_headers, column_span_classes))
+        columns = 'max-content 1fr 1fr max-content'
+        if self.show_timings:
+            headers.append((timings_column_header, ""))
+            columns += ' max-content'
         contents = [TextContent(x, css_properties=headers_props)
                     .add_classes(['header', span_class])
-                    for (x, span_class) in zip(self.column_headers, column_span_classes)]
+                    for (x, span_class) in headers]
+        contents.append(CssContent(CSS))
 
+        gridbox_layout  = Layout(grid_template_columns=columns, max_width="100%")
+        grid = GridBox(layout=gridbox_layout).add_class("nbae-fun")
+        if stream:
+            from IPython.display import display
+            grid.children = [content.widget() for content in contents]
+            contents = []
+            display(grid)
+
+        for result, entry in runs:
+            evaluation.add(result)
+            with timed(result.timings, 'render'):
+                row = self._render_result(result, entry, body_props)
+                # widgets are cached in the Content objects
+                for content in row:
+                    content.widget()
+            if self.show_timings:
+                row.append(TimingsContent(result.timings)
+                           .add_class('cell')
+                           .add_classes(['even'] if result.index % 2 == 0 else [])
+                           .add_css_properties(body_props))
+            if result.mismatch is not None:
+                row.append(TextContent(f"↳ {result.mismatch}")
+                           .add_classes(['cell', 'mismatch', 'span-1-to-4'])
+                           .add_css_properties(body_props))
+            if stream:
+                grid.children += tuple(content.widget() for content in row)
+            else:
+                contents.extend(row)
 
-        overall = True
+        if evaluation.error is not None:
+            contents.append(TextContent(evaluation.error)
+                            .add_classes(['cell', 'ko', 'span-1-to-4'])
+                            .add_css_properties(body_props))
+        elif evaluation.skipped:
+            contents.append(TextContent(f"fail fast: {evaluation.skipped} "
+                                        f"more dataset(s) skipped")
+                            .add_classes(['cell', 'skipped', 'span-1-to-4'])
+                            .add_css_properties(body_props))
 
-        for index, dataset in enumerate(datasets):
-            # will use original dataset for rendering to avoid any side-effects
-            # during running
+        optional = {} if evaluation.error is None else dict(error=evaluation.error)
+        log_correction(self.name, evaluation.success)
+        log2_correction(self.name, success=evaluation.success,
+                        passed=evaluation.passed, failed=evaluation.failed,
+                        skipped=evaluation.skipped,
+                        timings=total_timings((result.timings for result in evaluation),
+                                              digits=6),
+                        **optional)
 
-            # always clone all inputs
-            if copy_mode != 'tee':
-                student_dataset = dataset.clone(copy_mode)
-                ref_dataset = dataset.clone(copy_mode)
-            else:
-                student_dataset, ref_dataset = dataset.copy_for_tee('tee')
+        grid.children += tuple(content.widget() for content in contents)
+        return None if stream else grid
 
-            # run both codes
-            ref_exc, stu_exc = False, False
-            try:
-                expected = ref_dataset.call(self.solution, debug=DEBUG)
-            except Exception as exc:
-                expected = exc
-                ref_exc = True
 
-            try:
-                student_result = student_dataset.call(student_function, debug=DEBUG)
-            except Exception as exc:
-                student_result = exc
-                stu_exc = True
-
-            # compare results
-            is_ok = self.validate(expected, student_result)
-            if not is_ok:
-                overall = False
-            # render that run
-            result_content = ResultContent(is_ok)
-            classes = ['cell']
-            if index % 2 == 0:
-                classes.append("even")
-
-            call = Call(self.solution, dataset)
-            contents.append(self.call_renderer.render(call)
-                            .add_classes(classes)
-                            .add_css_properties(body_props))
-            contents.append(self.result_renderer.render(expected)
-                            .add_classes(classes).add_class('ok')
-                            .add_css_properties(body_props)
-                            .set_is_code(not ref_exc))
-            contents.append(self.result_renderer.render(student_result)
+    def _render_result(self, result, entry, body_props):
+        """
+        the 4 Content objects that make one row in correction()
+        """
+        result_content = ResultContent(result.ok)
+        classes = ['cell']
+        if result.index % 2 == 0:
+            classes.append("even")
+
+        call = Call(self.solution, result.dataset)
+        call_content = (self.call_renderer.render(call)
+                        .add_classes(classes)
+                        .add_css_properties(body_props))
+        expected_content = self._cached_content(entry, 'correction')
+        if expected_content is None:
+            expected_content = self._cache_content(
+                entry, 'correction',
+                self.result_renderer.render(result.expected)
+                .add_classes(classes).add_class('ok')
+                .add_css_properties(body_props)
+                .set_is_code(not result.ref_exc))
+        # a mismatch may come with a smaller object that shows the differences
+        obtained = result.obtained
+        if result.mismatch is not None and result.mismatch.diff is not None:
+            obtained = result.mismatch.diff
+        obtained_content = (self.result_renderer.render(obtained)
                             .add_classes(classes)
                             .add_class(result_content.the_class())
                             .add_css_properties(body_props)
-                            .set_is_code(not stu_exc))
-            contents.append(result_content
-                            .add_classes(classes)
-                            .add_css_properties(body_props))
+                            .set_is_code(not result.stu_exc))
+        result_content.add_classes(classes).add_css_properties(body_props)
+        return [call_content, expected_content, obtained_content, result_content]
 
-        log_correction(self.name, overall)
-        # xxx would make sense to expose how many examples were right or wrong
-        log2_correction(self.name, success=overall)
 
-        contents.append(CssContent(CSS))
+    def _evaluate(self, student_function, fail_fast):
+        """
+        iterates over the datasets, and yields tuples
+        (result, entry) - see _runs() - once the result has been validated
 
-        gridbox_layout  = Layout(grid_template_columns = 'max-content 1fr 1fr max-content',
-                                 max_width="100%")
-        grid = GridBox([content.widget() for content in contents],
-                       layout=gridbox_layout).add_class("nbae-fun")
-        return grid
+        with fail_fast, stops after the first failing dataset
+        """
+        runs = self._runs(student_function)
+        for result, entry in runs:
+            # some runs come already validated, see ExerciseGenerator
+            if result.ok is None:
+                with timed(result.timings, 'validate'):
+                    verdict = self.validate(result.expected, result.obtained)
+                result.ok = bool(verdict)
+                if isinstance(verdict, Mismatch):
+                    result.mismatch = verdict
+            yield result, entry
+            if fail_fast and not result.ok:
+                # do not run the remaining datasets
+                runs.close()
+                return
+
+
+    def _runs(self, student_function):
+        """
+        iterates over the datasets, in order, and yields tuples
+        (result, entry)
+        where result is a DatasetResult instance - not yet validated,
+        and entry is the cache entry for that dataset, or None if it can't be cached
+        """
+        lookups = [self._cache_lookup(index, dataset)
+                   for (index, dataset) in enumerate(self.datasets)]
+        # no need to run the solution when the result is known
+        solutions = [None if entry else self.solution for (_, entry) in lookups]
+        if self.executor == 'process':
+            results = self._runs_in_processes(student_function, solutions)
+        else:
+            results = (run_dataset(solution, student_function, dataset, self.copy_mode,
+                                   self.timeout, self.memory_limit)
+                       for (solution, dataset) in zip(solutions, self.datasets))
+        for index, (dataset, result, (fingerprint, entry)) \
+                in enumerate(zip(self.datasets, results, lookups)):
+            result.index, result.dataset = index, dataset
+            if entry is not None:
+                result.expected, result.ref_exc = entry['expected'], entry['ref_exc']
+            elif fingerprint is not None:
+                entry = self._cache.store(index, fingerprint,
+                                          expected=result.expected, ref_exc=result.ref_exc)
+            yield result, entry
+
+
+    def _runs_in_processes(self, student_function, solutions):
+        """
+        same as _runs, but runs in worker processes,
+        and yields only the results returned by run_dataset()
+        """
+        functions = [student_function]
+        if any(solutions):
+            functions.append(self.solution)
+        for function in functions:
+            exc = unpicklable(function)
+            if exc is not None:
+                print(f"WARNING: {self.name}: cannot ship function "
+                      f"{getattr(function, '__name__', function)} to worker processes "
+                      f"({type(exc).__name__}: {exc}) - running serially")
+                for solution, dataset in zip(solutions, self.datasets):
+                    yield run_dataset(solution, student_function, dataset, self.copy_mode,
+                                      self.timeout, self.memory_limit)
+                return
+
+        pool = process_pool(self.max_workers)
+        try:
+            futures = [pool.submit(run_dataset, solution, student_function,
+                                   dataset, self.copy_mode,
+                                   self.timeout, self.memory_limit)
+                       for (solution, dataset) in zip(solutions, self.datasets)]
+            for index, (solution, dataset, future) \
+                    in enumerate(zip(solutions, self.datasets, futures)):
+                # run_dataset catches all exceptions in the exercise code
+                # so this is about pickling the dataset or the results
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    print(f"WARNING: {self.name}: dataset #{index+1} {dataset} "
+                          f"could not be shipped to a worker process "
+                          f"({type(exc).__name__}: {exc}) - running it in the kernel")
+                    result = run_dataset(solution, student_function,
+                                         dataset, self.copy_mode,
+                                         self.timeout, self.memory_limit)
+                yield result
+        finally:
+            # when the caller stops early, no need to run the pending datasets
+            pool.shutdown(cancel_futures=True)
+
+
+    # caching the solution results
+    def _cache_lookup(self, index, dataset):
+        """
+        returns a tuple (fingerprint, entry)
+        fingerprint is None if that dataset can't be cached
+        entry is None if the result is not known yet
+        """
+        if not self.cache_expected:
+            return None, None
+        # the solution may have been changed on the fly
+        if self._cache_solution is not self.solution:
+            self.invalidate_cache()
+            self._cache_solution = self.solution
+            self._use_bundles = False
+        fingerprint = dataset.fingerprint()
+        entry = self._cache.get(index, fingerprint)
+        if entry is None and fingerprint is not None and self._use_bundles:
+            found = bundle_lookup(self.bundle_key(), index, fingerprint)
+            if found is not None:
+                expected, ref_exc = found
+                entry = self._cache.store(index, fingerprint,
+                                          expected=expected, ref_exc=ref_exc)
+        return fingerprint, entry
+
+
+    # the rendered Content objects are cached as well
+    # under a key that depends on the context - correction or example
+    @staticmethod
+    def _cached_content(entry, key):
+        return None if entry is None else entry['contents'].get(key)
+
+    @staticmethod
+    def _cache_content(entry, key, content):
+        if entry is not None:
+            entry['contents'][key] = content
+        return content
+
+
+    def bundle_key(self):
+        """
+        the key used to store results in a bundle; exonames are not
+        unique enough, as several exercises often share the same solution
+        with different settings
+        """
+        solution = self.solution
+        return (f"{self.name}:{getattr(solution, '__module__', '')}"
+                f".{getattr(solution, '__qualname__', '')}")
+
+
+    def expected_results(self):
+        """
+        runs the solution on all datasets, regardless of the cache
+
+        yields tuples (fingerprint, expected, ref_exc)
+        this is what gets stored in a results bundle
+        """
+        for dataset in self.datasets:
+            if self.copy_mode != 'tee':
+                ref_dataset = dataset.clone(self.copy_mode)
+            else:
+                ref_dataset, _ = dataset.copy_for_tee(self.copy_mode)
+            yield (dataset.fingerprint(), *run_function(self.solution, ref_dataset))
+
+
+    def invalidate_cache(self, index=None):
+        """
+        forget about the cached results of the solution,
+        either for all datasets, or for the one at that index
+        """
+        self._cache.invalidate(index)
 
 
     # public interface
     def example(self, how_many=None):
+        from ipywidgets import GridBox, Layout
 
         if how_many is None:
             how_many = self.nb_examples
@@ -292,11 +675,15 @@ class ExerciseFunction:                                           # pylint: disa
             else:
                 sample_dataset, dataset = dataset.copy_for_tee(self.copy_mode)
 
-            # run
-            try:
-                expected = sample_dataset.call(self.solution)
-            except Exception as exc:                     # pylint:disable=w0703
-                expected = exc
+            # run, unless already known
+            fingerprint, entry = self._cache_lookup(index, dataset)
+            if entry is not None:
+                expected = entry['expected']
+            else:
+                expected, ref_exc = run_function(self.solution, sample_dataset)
+                if fingerprint is not None:
+                    entry = self._cache.store(index, fingerprint,
+                                              expected=expected, ref_exc=ref_exc)
 
             # render that row
             classes = ['cell', 'example']
@@ -308,9 +695,14 @@ class ExerciseFunction:                                           # pylint: disa
             contents.append(self.call_renderer.render(call)
                             .add_classes(classes)
                             .add_css_properties(body_props))
-            contents.append(self.result_renderer.render(expected)
-                            .add_classes(classes)
-                            .add_css_properties(body_props))
+            expected_content = self._cached_content(entry, 'example')
+            if expected_content is None:
+                expected_content = self._cache_content(
+                    entry, 'example',
+                    self.result_renderer.render(expected)
+                    .add_classes(classes)
+                    .add_css_properties(body_props))
+            contents.append(expected_content)
 
         contents.append(CssContent(CSS))
 
@@ -344,22 +736,38 @@ class ExerciseFunction:                                           # pylint: disa
 try:
     import numpy as np
     import warnings
+    from .validation import compare_arrays
 
     class ExerciseFunctionNumpy(ExerciseFunction):
         """
         This is suitable for functions that are expected to return a numpy (nd)array
+
+        arrays are compared with the same shape, and with np.isclose
+        for floating point values, using rtol, atol and equal_nan;
+        this is done by chunks of about chunk_size elements, so as to
+        not allocate large temporary arrays - see validation.compare_arrays
         """
 
-        def __init__(self, solution, datasets,
+        def __init__(self, solution, datasets,            # pylint: disable=r0913
                      *args,
+                     rtol=1e-05, atol=1e-08, equal_nan=False, chunk_size=2**20,
                      **kwds):
             ExerciseFunction.__init__(
                 self, solution, datasets,
                 # xxx check this again
                 *args, **kwds)
+            self.rtol = rtol
+            self.atol = atol
+            self.equal_nan = equal_nan
+            self.chunk_size = chunk_size
 
         # redefine validation function on numpy arrays
         def validate(self, expected, result):
+            if isinstance(expected, np.ndarray) and isinstance(result, np.ndarray):
+                return compare_arrays(expected, result,
+                                      rtol=self.rtol, atol=self.atol,
+                                      equal_nan=self.equal_nan,
+                                      chunk_size=self.chunk_size)
             try:
                 return np.all(
                     np.isclose(
@@ -390,13 +798,32 @@ except ModuleNotFoundError:
 try:
     import pandas as pd
 
+    from .validation import compare_frames
+
     class ExerciseFunctionPandas(ExerciseFunction):
         """
         This is suitable for functions that are expected to return 
         either a pandas DataFrame or Series object
+
+        the schema is checked first, then the rows are compared through
+        their hashes; floating point columns are compared with a tolerance
+        if rtol or atol is set; when rows differ, the correction only shows
+        the first max_diff_rows of them - see validation.compare_frames
         """
+        def __init__(self, solution, datasets,            # pylint: disable=r0913
+                     *args,
+                     rtol=0., atol=0., max_diff_rows=10,
+                     **kwds):
+            super().__init__(solution, datasets, *args, **kwds)
+            self.rtol = rtol
+            self.atol = atol
+            self.max_diff_rows = max_diff_rows
+
         def validate(self, expected, result):
-            return expected.equals(result)
+            if not isinstance(expected, (pd.DataFrame, pd.Series)):
+                return expected.equals(result)
+            return compare_frames(expected, result, rtol=self.rtol, atol=self.atol,
+                                  max_rows=self.max_diff_rows)
 except ModuleNotFoundError:
     class ExerciseFunctionPandas(ExerciseFunction):
         def __init__(self, *args, **kwds):
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111, r0902, r0913
+
+"""
+exercises on classes, where the student class is also checked
+against random sequences of method calls
+
+the methods are declared in a dict, that maps each method name to a spec
+for its arguments - see draw_args(); many random sequences are run on both
+classes, with no rendering, until one diverges; that sequence is then
+shrunk - i.e. reduced to a minimal sequence that still diverges - and
+this counterexample only is shown in the correction, as a regular scenario
+"""
+
+import time
+import random
+
+from .args import ArgsTupleDict, Args
+from .exercise_class import (
+    ExerciseClass, ClassScenario, ClassExpression, MethodCall, run_scenario)
+
+
+def draw_args(spec, rng):
+    """
+    the arguments for one call, from a spec that is either
+    * None, for no argument
+    * an Args instance, that is used as is
+    * a function that takes a random.Random instance and returns an Args instance
+    * or a list of Args instances, to pick from
+    """
+    if spec is None:
+        return Args()
+    if isinstance(spec, ArgsTupleDict):
+        return spec
+    if callable(spec):
+        return spec(rng)
+    return rng.choice(spec)
+
+
+class ExerciseClassFuzz(ExerciseClass):
+    """
+    an ExerciseClass where, on top of the scenarios - that can be empty -
+    the student class is run on nb_sequences random sequences of calls
+
+    methods is a dict methodname -> spec, see draw_args(); init_args
+    is a spec for the arguments to the constructor, with the same format
+
+    each sequence has between 1 and max_length calls; the calls are made
+    with MethodCall steps, so no code gets compiled; when check_init is set,
+    the object is also checked at the end of each sequence, through its repr()
+
+    the search stops at the first divergence, or after fuzz_timeout seconds
+    if set; the sequences are drawn from random.Random(seed), so that all
+    corrections try the same sequences
+
+    the diverging sequence is then shrunk, by removing as many calls as possible
+    while it still diverges, and it is shown after the scenarios
+    """
+
+    def __init__(self, solution, methods, scenarios=(), *,
+                 init_args=None, nb_sequences=1000, max_length=20,
+                 seed=0, fuzz_timeout=None, **kwds):
+        super().__init__(solution, list(scenarios), **kwds)
+        self.methods = dict(methods)
+        self.init_args = init_args
+        self.nb_sequences = nb_sequences
+        self.max_length = max_length
+        self.seed = seed
+        self.fuzz_timeout = fuzz_timeout
+
+
+    def __getstate__(self):
+        # the specs may well be lambdas, and are not needed in worker processes
+        state = super().__getstate__()
+        state['methods'] = state['init_args'] = None
+        return state
+
+
+    def random_sequences(self):
+        """
+        the random sequences, as tuples (init_args, calls)
+        where calls is a list of MethodCall objects
+        """
+        rng = random.Random(self.seed)
+        names = sorted(self.methods)
+        for _ in range(self.nb_sequences):
+            init_args = draw_args(self.init_args, rng)
+            calls = []
+            for _ in range(rng.randint(1, self.max_length)):
+                name = rng.choice(names)
+                calls.append(MethodCall(name, draw_args(self.methods[name], rng)))
+            yield init_args, calls
+
+
+    def _scenario(self, init_args, calls):
+        steps = list(calls)
+        if self.check_init:
+            steps.append(ClassExpression("INSTANCE"))
+        return ClassScenario(init_args, *steps)
+
+
+    def _diverging(self, stu_class, init_args, calls):
+        """
+        runs that sequence, and returns None if both classes agree;
+        otherwise a tuple (calls, step_results), where the calls
+        that come after the divergence have been dropped
+        """
+        scenario = self._scenario(init_args, calls)
+        step_results = run_scenario(self, stu_class, scenario, fail_fast=True)
+        if all(step_result.ok for step_result in step_results):
+            return None
+        # the first result is about the creation of the objects
+        return calls[:len(step_results)-1], step_results
+
+
+    def shrink(self, stu_class, init_args, calls):
+        """
+        removes chunks of calls - of decreasing sizes - as long as
+        the sequence still diverges; returns a tuple (calls, step_results),
+        or None if the sequence does not diverge in the first place
+        """
+        diverging = self._diverging(stu_class, init_args, calls)
+        if diverging is None:
+            return None
+        calls, _ = diverging
+        chunk = len(calls) // 2 or 1
+        while chunk:
+            start = 0
+            while start < len(calls):
+                attempt = self._diverging(stu_class, init_args,
+                                          calls[:start] + calls[start+chunk:])
+                if attempt is not None:
+                    diverging = attempt
+                    calls, _ = diverging
+                else:
+                    start += chunk
+            chunk //= 2
+        return diverging
+
+
+    def fuzz(self, stu_class):
+        """
+        runs the random sequences until one diverges, and returns
+        a tuple (scenario, step_results) for the shrunk sequence,
+        or None if no divergence was found
+        """
+        start = time.perf_counter()
+        for tried, (init_args, calls) in enumerate(self.random_sequences(), 1):
+            if self.fuzz_timeout is not None \
+                    and time.perf_counter() - start > self.fuzz_timeout:
+                return None
+            shrunk = self.shrink(stu_class, init_args, calls)
+            if shrunk is None:
+                continue
+            shrunk_calls, step_results = shrunk
+            scenario = self._scenario(init_args, shrunk_calls)
+            # no need to show the final check if it was not reached
+            scenario.steps = scenario.steps[:len(step_results)-1]
+            scenario.note = (f"séquence aléatoire n°{tried}, réduite "
+                             f"de {len(calls)} à {len(shrunk_calls)} appel(s)")
+            return scenario, step_results
+        return None
+
+
+    def _scenario_runs(self, stu_class, fail_fast, print_exceptions):
+        """
+        the scenarios first, then the counterexample if any
+        """
+        passed = True
+        for scenario, step_results in super()._scenario_runs(
+                stu_class, fail_fast, print_exceptions):
+            passed = passed and all(step_result.ok for step_result in step_results)
+            yield scenario, step_results
+        if fail_fast and not passed:
+            return
+        counterexample = self.fuzz(stu_class)
+        if counterexample is not None:
+            yield counterexample
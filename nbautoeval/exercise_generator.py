@@ -2,12 +2,140 @@
 
 # pylint: disable=c0111, r1705, w0703
 
-import itertools
 import functools
 from collections.abc import Iterator
 
-from .exercise_function import ExerciseFunction
+from .exercise_function import ExerciseFunction, run_function
 from .callrenderer import IsliceRenderer
+from .content import TextContent
+from .results import DatasetResult
+from .validation import compare_streams, Mismatch, StreamWindow
+from .limits import limited, LimitExceeded
+from .helpers import timed
+
+
+# a generator that spins between 2 items would otherwise block the kernel
+DEFAULT_TIMEOUT = 10.
+
+
+def _bounded(iterator, max_iterations):
+    for count, item in enumerate(iterator):
+        if count == max_iterations:
+            yield '...'
+            return
+        yield item
+
+
+class _Counted:
+    """
+    an iterator that counts the items it yields
+    """
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self.iterator)
+        self.count += 1
+        return item
+
+
+class _SharedStream:
+    """
+    memoizes the items of an iterator, so that several readers can go
+    through it one after the other, each one from the start, while the
+    iterator is run only once; an exception raised by the iterator is
+    raised again to all readers that reach that point
+
+    each reader is created with its own islice start, and the ones of
+    the readers to come; only the items that these will need are kept,
+    the ones below are yielded as None, to be skipped by islice anyway
+    """
+    def __init__(self, iterator):
+        self.iterator = iterator
+        # the items at indexes fetched - len(items) to fetched
+        self.items = []
+        self.fetched = 0
+        self.error = None
+        self.done = False
+
+    def reader(self, start=0, later=()):
+        # the index of the first item that a later reader will need
+        floor = min(later, default=None)
+        base = self.fetched - len(self.items)
+        needed = start if floor is None else min(start, floor)
+        del self.items[:max(needed - base, 0)]
+        index = 0
+        while True:
+            base = self.fetched - len(self.items)
+            if index < base:
+                yield None
+                index += 1
+                continue
+            if index < self.fetched:
+                yield self.items[index - base]
+                index += 1
+                continue
+            if self.error is not None:
+                raise self.error
+            if self.done:
+                return
+            try:
+                item = next(self.iterator)
+            except StopIteration:
+                self.done = True
+                return
+            except Exception as exc:
+                self.error = exc
+                raise
+            self.fetched += 1
+            if floor is not None and index >= floor:
+                self.items.append(item)
+            else:
+                # nobody will read these again
+                self.items.clear()
+            yield item
+            index += 1
+
+
+def _sharing(streams, key, stream, start=0, later=()):
+    """
+    a function to pass to GeneratorArgs.iterate() in place of stream;
+    when key is not None, it returns a reader on the iterator shared
+    under that key in streams, that is created on first use;
+    start and later are the islice starts for this reader and the next ones
+    """
+    def function(*args, **kwds):
+        if key is None:
+            return stream(*args, **kwds)
+        if key not in streams:
+            streams[key] = _SharedStream(stream(*args, **kwds))
+        return streams[key].reader(start, later)
+    return function
+
+
+def _islice_start(dataset):
+    islice = getattr(dataset, 'islice', None)
+    return (islice[0] or 0) if islice and len(islice) > 1 else 0
+
+
+class PartialStream(list):
+    """
+    the items obtained from a student iterator before it hit a limit;
+    rendered as a list, but marked as such
+    """
+
+    def __init__(self, items, exc):
+        super().__init__(items)
+        self.exc = exc
+
+    def _render_content_(self):
+        return (TextContent(repr(list(self)))
+                .add_css_properties({'align-self': 'center'})
+                .add_class('limit-exceeded'))
 
 
 class ExerciseGenerator(ExerciseFunction):
@@ -20,33 +148,61 @@ class ExerciseGenerator(ExerciseFunction):
     (*) counting the number of items in the enumeration 
         maxed by max_iterations if relevant
     (*) comparing each of the results yielded by next()
+
+    the student iterator is consumed lazily, in lockstep with the expected
+    results, and it is not consumed any further after the first difference;
+    only a bounded window of the items obtained is kept for display
+
+    timeout is a time budget for each dataset, that defaults to DEFAULT_TIMEOUT;
+    when it is exhausted, the items obtained so far are shown, and the
+    row is marked as timed out
+
+    datasets that differ only in their islice share one generator instance,
+    both for the solution and for the student code: e.g. with islice=(100, 101)
+    and islice=(1000, 1001), the first 100 items are computed only once
     """
 
     @staticmethod
-    def generator_to_solution(generator_function, max_iterations=None):
+    def generator_to_stream(generator_function, max_iterations=None):
+        """
+        a function that returns the iterator, bounded by max_iterations
+        but not consumed; when the iterator has more than max_iterations items,
+        the first extra item is replaced with '...'
+        """
         @functools.wraps(generator_function)
-        def solution(*args, **kwds):
+        def stream(*args, **kwds):
             # call the function written by the student
             generator = generator_function(*args, **kwds)
             if not isinstance(generator, (Iterator, range)):
                 raise TypeError(f"not an iterator! received a {type(generator).__name__} instance: {generator} ")
             if max_iterations is None:
-                return list(generator)
-            result = list(itertools.islice(generator, None, max_iterations+1))
-            if len(result) == max_iterations+1:
-                result[-1] = '...'
-            return result
+                return iter(generator)
+            return _bounded(generator, max_iterations)
+        return stream
+
+
+    @staticmethod
+    def generator_to_solution(generator_function, max_iterations=None):
+        stream = ExerciseGenerator.generator_to_stream(generator_function, max_iterations)
+        @functools.wraps(generator_function)
+        def solution(*args, **kwds):
+            return list(stream(*args, **kwds))
+        # so that the student code can be consumed lazily, see _runs()
+        solution.stream = stream
         return solution
 
 
     def __init__(self, generator_function, datasets, max_iterations=None,
-                 *args, **keywords):
+                 *args, window=10, **keywords):
         """
         a generator exercise is made with
         . a generator function for the solution
         . a list of Args instances to produce iterators that are then tested
         . max_iterations is a global limit on the number of items 
           that are attempted to be retrieved
+        . window is the number of items obtained from the student code that
+          are kept for display, at the beginning and right before the
+          first difference
         . additional settings from ExerciseFunction
         """
         # change default
@@ -54,18 +210,109 @@ class ExerciseGenerator(ExerciseFunction):
                                                            max_iterations)
         if 'call_renderer' not in keywords:
             keywords['call_renderer'] = IsliceRenderer()
+        keywords.setdefault('timeout', DEFAULT_TIMEOUT)
         super().__init__(solution, datasets, *args, **keywords)
         self.generator_function = generator_function
         self.max_iterations = max_iterations
+        self.window = window
         # that was part of the aborted 0.6.1 attempt
         # to copy incoming generators - see also issue #4
         #if 'copy_mode' not in keywords:
         #    self.copy_mode = 'tee'
 
 
-    def correction(self, student_generator):                    
-        student_solution = ExerciseGenerator.generator_to_solution(
-            student_generator, self.max_iterations)
-        return ExerciseFunction.correction(self, student_solution)
+    def bundle_key(self):
+        return f"{super().bundle_key()}:{self.max_iterations}"
 
 
+    def student_solution(self, submission):
+        return ExerciseGenerator.generator_to_solution(
+            submission, self.max_iterations)
+
+
+    def _runs(self, student_function):
+        """
+        like ExerciseFunction._runs(), but the student iterator is compared
+        on the fly with the expected results, so the results come validated
+
+        the solution results are still computed as lists - and cached;
+        this always runs in the kernel, as the functions at work here
+        are closures that can't be shipped to worker processes anyway
+        """
+        stream = getattr(student_function, 'stream', None)
+        if stream is None or self.copy_mode == 'tee':
+            yield from super()._runs(student_function)
+            return
+        ref_stream = getattr(self.solution, 'stream', None)
+        # datasets that produce the same iterator share it
+        keys = [getattr(dataset, 'call_fingerprint', lambda: None)()
+                for dataset in self.datasets]
+        keys = [key if key is not None and keys.count(key) > 1 else None
+                for key in keys]
+        starts = [_islice_start(dataset) for dataset in self.datasets]
+        ref_streams, stu_streams = {}, {}
+        for index, (dataset, key) in enumerate(zip(self.datasets, keys)):
+            # what the next datasets on the same iterator will need
+            later = [start for start, other in zip(starts[index+1:], keys[index+1:])
+                     if key is not None and other == key]
+            timings = {}
+            with timed(timings, 'clone'):
+                student_dataset = dataset.clone(self.copy_mode)
+            fingerprint, entry = self._cache_lookup(index, dataset)
+            if entry is not None:
+                expected, ref_exc = entry['expected'], entry['ref_exc']
+            else:
+                with timed(timings, 'clone'):
+                    ref_dataset = dataset.clone(self.copy_mode)
+                with timed(timings, 'solution'):
+                    if key is None or ref_stream is None:
+                        expected, ref_exc = run_function(self.solution, ref_dataset)
+                    else:
+                        try:
+                            expected, ref_exc = list(ref_dataset.iterate(
+                                _sharing(ref_streams, key, ref_stream,
+                                         starts[index], later))), False
+                        except Exception as exc:
+                            expected, ref_exc = exc, True
+                if fingerprint is not None:
+                    entry = self._cache.store(index, fingerprint,
+                                              expected=expected, ref_exc=ref_exc)
+            result = DatasetResult(expected, ref_exc, None, False,
+                                   index=index, dataset=dataset, timings=timings)
+            with timed(timings, 'student'):
+                if ref_exc or not hasattr(dataset, 'iterate'):
+                    # nothing to compare with on the fly
+                    result.obtained, result.stu_exc = run_function(
+                        student_function, student_dataset, self.timeout, self.memory_limit)
+                else:
+                    shown = StreamWindow(self.window)
+                    # count the items produced, before islice applies
+                    counted = _Counted(())
+                    sharing = _sharing(stu_streams, key, stream, starts[index], later)
+                    def counting_stream(*args, **kwds):
+                        nonlocal counted
+                        counted = _Counted(sharing(*args, **kwds))
+                        return counted
+                    try:
+                        with limited(self.timeout, self.memory_limit):
+                            verdict, obtained = compare_streams(
+                                expected, student_dataset.iterate(counting_stream),
+                                window=shown)
+                        result.ok = bool(verdict)
+                        # when all items match, they are the expected ones
+                        result.obtained = expected if result.ok else obtained
+                        if not result.ok:
+                            result.mismatch = verdict
+                    except LimitExceeded as exc:
+                        # keep what was obtained so far
+                        result.obtained = PartialStream(shown.items(), exc)
+                        result.ok = False
+                        result.mismatch = Mismatch(
+                            f"{exc}, after {counted.count} item(s) produced")
+                        # the shared iterator may have been broken,
+                        # the next datasets will start over
+                        stu_streams.pop(key, None)
+                    except Exception as exc:
+                        result.obtained, result.stu_exc = exc, True
+                        result.ok = False
+            yield result, entry
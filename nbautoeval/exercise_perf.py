@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111, r0902, r0913
+
+"""
+exercises where the student code is checked for correctness,
+and also for its algorithmic complexity
+
+the datasets are built by a factory function, from a range of sizes -
+typically geometric, see geometric_sizes(); both the solution and the
+student code are timed on each size, and the growth of these timings
+is fitted as a power of the size, i.e. time ~ size ** exponent
+"""
+
+import math
+import time
+
+from .content import TextContent, CssContent, ResultContent
+from .exercise_function import ExerciseFunction, InvalidSubmission, run_function, CSS
+from .storage import log_correction, log2_correction
+from .limits import TimeoutExceeded
+from .results import DatasetResult, Evaluation
+
+
+column_headers = (
+    "taille",
+    "référence",
+    "obtenu",
+    "ratio",
+    "",
+)
+
+# when a call is faster than that, it is repeated in a loop
+MIN_DURATION = 0.005
+MAX_NUMBER = 1000
+
+# the default timeout for the student code, in seconds, is this factor
+# times max_ratio times the duration of the solution, with a lower bound
+TIMEOUT_FACTOR = 2
+MIN_TIMEOUT = 1.
+
+
+def geometric_sizes(start, stop, count):
+    """
+    count integer sizes, from start to stop, in geometric progression
+    """
+    if count == 1:
+        return [start]
+    factor = (stop / start) ** (1 / (count - 1))
+    return sorted({round(start * factor ** i) for i in range(count)})
+
+
+def fit_exponent(sizes, durations):
+    """
+    the slope of the least-squares fit of log(duration) against log(size)
+    or None if there are not enough usable points
+    """
+    points = [(math.log(size), math.log(duration))
+              for (size, duration) in zip(sizes, durations)
+              if size > 0 and duration and duration > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for (x, _) in points) / len(points)
+    mean_y = sum(y for (_, y) in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for (x, _) in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for (x, y) in points) / variance
+
+
+def time_function(function, dataset, copy_mode, repeat,
+                  timeout=None, memory_limit=None):
+    """
+    runs function on clones of dataset, and returns a tuple
+    (result, is_exc, duration)
+    where duration is the best time for one call, in seconds
+
+    calls that are too fast to be measured reliably are run in a loop;
+    cloning is not part of the measure
+    """
+    clone = dataset.clone(copy_mode)
+    start = time.perf_counter()
+    result, is_exc = run_function(function, clone, timeout, memory_limit)
+    best = time.perf_counter() - start
+    if is_exc:
+        return result, is_exc, best
+    number = min(MAX_NUMBER, max(1, math.ceil(MIN_DURATION / max(best, 1e-9))))
+    for _ in range(repeat - 1 if number == 1 else repeat):
+        clones = [dataset.clone(copy_mode) for _ in range(number)]
+        start = time.perf_counter()
+        for clone in clones:
+            result, is_exc = run_function(function, clone, timeout, memory_limit)
+            if is_exc:
+                return result, is_exc, time.perf_counter() - start
+        best = min(best, (time.perf_counter() - start) / number)
+    return result, is_exc, best
+
+
+class PerfEvaluation(Evaluation):
+    """
+    an Evaluation that also accounts for the growth of the timings
+
+    the student code fails if either
+    * the fitted exponent exceeds the one of the solution by more than max_exponent_delta
+    * or it is slower than the solution by more than max_ratio on the largest size
+    """
+
+    def __init__(self, exoname, nb_datasets, max_exponent_delta, max_ratio):
+        super().__init__(exoname, nb_datasets)
+        self.max_exponent_delta = max_exponent_delta
+        self.max_ratio = max_ratio
+
+    def _durations(self, key):
+        return [result.timings.get(key) for result in self.results]
+
+    @property
+    def ref_exponent(self):
+        return fit_exponent([result.dataset.size for result in self.results],
+                            self._durations('solution'))
+
+    @property
+    def stu_exponent(self):
+        return fit_exponent([result.dataset.size for result in self.results],
+                            self._durations('student'))
+
+    @property
+    def ratio(self):
+        """
+        the ratio student / solution on the largest size, or None
+        """
+        if not self.results:
+            return None
+        timings = self.results[-1].timings
+        if not timings.get('solution'):
+            return None
+        return timings['student'] / timings['solution']
+
+    @property
+    def complexity_ok(self):
+        ref_exponent, stu_exponent = self.ref_exponent, self.stu_exponent
+        if ref_exponent is not None and stu_exponent is not None:
+            if stu_exponent - ref_exponent > self.max_exponent_delta:
+                return False
+        ratio = self.ratio
+        return ratio is None or ratio <= self.max_ratio
+
+    @property
+    def success(self):
+        return self.failed == 0 and self.skipped == 0 and self.complexity_ok
+
+    @property
+    def grade(self):
+        """
+        all or nothing, as correct but too slow code fails
+        """
+        return float(self.success)
+
+    def to_dict(self):
+        return dict(super().to_dict(),
+                    ref_exponent=self.ref_exponent, stu_exponent=self.stu_exponent,
+                    ratio=self.ratio, complexity_ok=self.complexity_ok)
+
+
+class ExerciseFunctionPerf(ExerciseFunction):
+    """
+    an ExerciseFunction that also checks the complexity of the student code
+
+    dataset_factory is a function that, given a size, returns a dataset -
+    typically an Args instance; the size is attached to the dataset
+    as its 'size' attribute
+
+    sizes is the list of sizes to use, in increasing order; defaults to
+    geometric_sizes(100, 100_000, 4)
+
+    on each size, both functions are run repeat times, and the best time
+    is retained; the student code fails if its results are wrong, or if
+    * its fitted exponent exceeds the one of the solution
+      by more than max_exponent_delta
+    * or it is slower than the solution by more than max_ratio
+      on the largest size
+
+    timeout applies to each call of the student code; it defaults to
+    TIMEOUT_FACTOR * max_ratio times the duration of the solution on that
+    size, and at least MIN_TIMEOUT; the larger sizes are skipped when
+    the student code times out, or as soon as its best time is slower
+    than the one of the solution by more than max_ratio
+
+    the correction shows one row per size, and a summary row
+    with the fitted exponents
+    """
+
+    def __init__(self, solution, dataset_factory, sizes=None, *,
+                 repeat=3, max_exponent_delta=0.5, max_ratio=10.,
+                 **kwds):
+        self.dataset_factory = dataset_factory
+        self.sizes = list(sizes) if sizes is not None else geometric_sizes(100, 100_000, 4)
+        self.repeat = repeat
+        self.max_exponent_delta = max_exponent_delta
+        self.max_ratio = max_ratio
+        datasets = []
+        for size in self.sizes:
+            dataset = dataset_factory(size)
+            dataset.size = size
+            datasets.append(dataset)
+        super().__init__(solution, datasets, **kwds)
+
+
+    def bundle_key(self):
+        return f"{super().bundle_key()}:{self.sizes}"
+
+
+    def _new_evaluation(self):
+        return PerfEvaluation(self.name, len(self.datasets),
+                              self.max_exponent_delta, self.max_ratio)
+
+
+    def _evaluate(self, student_function, fail_fast):
+        """
+        the timings are taken in the kernel, one size after the other;
+        the results of the solution are not cached, as it needs to be timed anyway,
+        so like with ExerciseFunction this yields tuples (result, None)
+        """
+        for index, dataset in enumerate(self.datasets):
+            expected, ref_exc, ref_duration = time_function(
+                self.solution, dataset, self.copy_mode, self.repeat)
+            timeout = self.timeout
+            if timeout is None:
+                timeout = max(MIN_TIMEOUT, TIMEOUT_FACTOR * self.max_ratio * ref_duration)
+            obtained, stu_exc, stu_duration = time_function(
+                student_function, dataset, self.copy_mode, self.repeat,
+                timeout, self.memory_limit)
+            result = DatasetResult(expected, ref_exc, obtained, stu_exc,
+                                   index=index, dataset=dataset,
+                                   timings=dict(solution=ref_duration,
+                                                student=stu_duration))
+            result.ok = not stu_exc and bool(self.validate(expected, obtained))
+            yield result, None
+            if isinstance(obtained, TimeoutExceeded) or (fail_fast and not result.ok):
+                return
+            # no need to go on with larger sizes; both durations are best times
+            if stu_duration > self.max_ratio * ref_duration:
+                return
+
+
+    def correction(self, student_function, fail_fast=False, stream=None):
+        """
+        one row per size, with the timings of both functions
+        """
+        from ipywidgets import GridBox, Layout
+
+        stream = self.stream if stream is None else stream
+        headers_props = {'font-size': self.header_font_size}
+        body_props = {'font-size': self.font_size}
+        contents = [TextContent(header, css_properties=headers_props).add_class('header')
+                    for header in column_headers]
+        contents.append(CssContent(CSS))
+
+        gridbox_layout = Layout(grid_template_columns='repeat(5, max-content)',
+                                max_width="100%")
+        grid = GridBox(layout=gridbox_layout).add_class("nbae-fun")
+        if stream:
+            from IPython.display import display
+            grid.children = [content.widget() for content in contents]
+            contents = []
+            display(grid)
+
+        evaluation = self._new_evaluation()
+        try:
+            student_function = self.student_solution(student_function)
+            runs = self._evaluate(student_function, fail_fast)
+        except InvalidSubmission as exc:
+            evaluation.error = str(exc)
+            runs = ()
+        for result, _ in runs:
+            evaluation.add(result)
+            row = self._render_perf_row(result, body_props)
+            if stream:
+                grid.children += tuple(content.widget() for content in row)
+            else:
+                contents.extend(row)
+
+        contents.extend(self._render_summary(evaluation, body_props))
+
+        optional = {} if evaluation.error is None else dict(error=evaluation.error)
+        log_correction(self.name, evaluation.success)
+        log2_correction(self.name, success=evaluation.success,
+                        passed=evaluation.passed, failed=evaluation.failed,
+                        skipped=evaluation.skipped,
+                        ref_exponent=evaluation.ref_exponent,
+                        stu_exponent=evaluation.stu_exponent,
+                        ratio=evaluation.ratio, **optional)
+
+        grid.children += tuple(content.widget() for content in contents)
+        return None if stream else grid
+
+
+    @staticmethod
+    def _render_perf_row(result, body_props):
+        classes = ['cell']
+        if result.index % 2 == 0:
+            classes.append("even")
+        ref_duration = result.timings['solution']
+        stu_duration = result.timings['student']
+        if result.stu_exc:
+            obtained = str(result.obtained)
+        elif not result.ok:
+            obtained = "résultat incorrect"
+        else:
+            obtained = f"{stu_duration*1000:.3f} ms"
+        ratio = f"{stu_duration/ref_duration:.1f}" if ref_duration else "-"
+        result_content = ResultContent(result.ok)
+        row = [
+            TextContent(str(result.dataset.size)).add_classes(classes),
+            TextContent(f"{ref_duration*1000:.3f} ms").add_classes(classes).add_class('ok'),
+            TextContent(obtained).add_classes(classes).add_class(result_content.the_class()),
+            TextContent(ratio).add_classes(classes),
+            result_content.add_classes(classes),
+        ]
+        return [content.add_css_properties(body_props) for content in row]
+
+
+    @staticmethod
+    def _render_summary(evaluation, body_props):
+        def exponent(value):
+            return "?" if value is None else f"{value:.2f}"
+        message = (f"croissance en n^{exponent(evaluation.ref_exponent)} attendue, "
+                   f"n^{exponent(evaluation.stu_exponent)} obtenue")
+        if evaluation.error is not None:
+            message = evaluation.error
+        elif evaluation.skipped:
+            message += f" - {evaluation.skipped} taille(s) non testée(s)"
+        result_content = ResultContent(evaluation.success)
+        return [
+            TextContent(message)
+            .add_classes(['cell', result_content.the_class(), 'span-1-to-4'])
+            .add_css_properties(body_props),
+            result_content.add_class('cell').add_css_properties(body_props),
+        ]
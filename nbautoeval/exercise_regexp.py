@@ -4,10 +4,22 @@
 
 
 import re
+import mmap
+import itertools
+from pathlib import Path
+from contextlib import contextmanager
 
-from .exercise_function import ExerciseFunction
+from .args import Args
+from .content import TextContent, CssContent, ResultContent
+from .exercise_function import ExerciseFunction, InvalidSubmission, CSS
+from .helpers import truncate
+from .limits import limited, LimitExceeded
+from .results import DatasetResult, Evaluation
+from .storage import log_correction, log2_correction
 
 DEFAULT_MATCH_MODE = 'match'
+# a pattern with catastrophic backtracking would otherwise hang the kernel
+DEFAULT_TIMEOUT = 1.
 
 class ExerciseRegexp(ExerciseFunction):
     """
@@ -15,15 +27,21 @@ class ExerciseRegexp(ExerciseFunction):
     which is transformed into a function that essentially
     takes an input string and returns a boolean
     that says if the *whole* string matches or not
+
+    the student pattern is compiled once per correction; a pattern that
+    does not compile is reported as a single error; the time spent on
+    each input is bounded by timeout, that defaults to DEFAULT_TIMEOUT seconds
     """
     
     def regexp_to_solution(self, regexp, match_mode):
+        # raises re.error if the pattern does not compile
+        pattern = re.compile(regexp)
         def solution(string):
             if match_mode in ('match', 'search'):
                 if match_mode == 'match':
-                    match = re.match(regexp, string)
+                    match = pattern.match(string)
                 else:
-                    match = re.search(regexp, string)
+                    match = pattern.search(string)
                 if not match:
                     return False
                 else:
@@ -32,10 +50,10 @@ class ExerciseRegexp(ExerciseFunction):
                     return match.group(0) == string
             # findall returns strings, while finditer returns match instances
             elif match_mode == 'findall':
-                return re.findall(regexp, string)
+                return pattern.findall(string)
             elif match_mode == 'finditer':
                 return [match.span()
-                        for match in re.finditer(regexp, string)]
+                        for match in pattern.finditer(string)]
             return None
         return solution
 
@@ -50,6 +68,7 @@ class ExerciseRegexp(ExerciseFunction):
         . additional settings from ExerciseFunction
         """
         solution = self.regexp_to_solution(regexp, match_mode)
+        keywords.setdefault('timeout', DEFAULT_TIMEOUT)
         super().__init__(solution, inputs, *args, **keywords)
         self.regexp = regexp
         self.name = name
@@ -58,9 +77,16 @@ class ExerciseRegexp(ExerciseFunction):
         # that would always be 'solution' anyways
         self.call_renderer.show_function = False
 
-    def correction(self, student_regexp):               # pylint: disable=w0221
-        student_solution = self.regexp_to_solution(student_regexp, self.match_mode)
-        return ExerciseFunction.correction(self, student_solution)
+    def bundle_key(self):
+        # the solution is a closure, what matters is the regexp
+        return f"{self.name}:{type(self).__name__}:{self.match_mode}:{self.regexp}"
+
+    def student_solution(self, submission):
+        try:
+            return self.regexp_to_solution(submission, self.match_mode)
+        except (re.error, TypeError) as exc:
+            raise InvalidSubmission(f"invalid regexp {submission!r} - "
+                                    f"{type(exc).__name__}: {exc}") from exc
     
     @property
     def column_headers(self):
@@ -94,19 +120,20 @@ class ExerciseRegexpGroups(ExerciseRegexp):
             # only tested with 'match' so far
             print(f"WARNING: ExerciseRegexpGroups : "
                   f"match_mode {match_mode} not yet implemented")
+        pattern = re.compile(regexp)
         def solution(string):
             if match_mode in ('match', 'search'):
                 if match_mode == 'match':
-                    match = re.match(regexp, string)
+                    match = pattern.match(string)
                 else:
-                    match = re.search(regexp, string)
+                    match = pattern.search(string)
                 return match and [ExerciseRegexpGroups.extract_group(match, group)
                                   for group in groups]
             # findall returns strings, while finditer returns match instances
             elif match_mode == 'findall':
-                return re.findall(regexp, string)
+                return pattern.findall(string)
             elif match_mode == 'finditer':
-                matches = re.finditer(regexp, string)
+                matches = pattern.finditer(string)
                 return [[ExerciseRegexpGroups.extract_group(match, group)
                          for group in groups] for match in matches]
             return None
@@ -117,7 +144,253 @@ class ExerciseRegexpGroups(ExerciseRegexp):
         self.groups = groups
         super().__init__(name, regexp, inputs, *args, match_mode=match_mode, **keywords)
 
+    def bundle_key(self):
+        return f"{super().bundle_key()}:{self.groups}"
+
     @property
     def column_headers(self):
         return (self._column_headers if self._column_headers is not None 
             else ('chaîne', 'groupes', 'obtenu'))
+
+
+##############################
+class CorpusEvaluation(Evaluation):
+    """
+    the outcome of an ExerciseRegexpCorpus correction
+
+    passed and failed count the units - lines or matches - on which
+    the solution and the student pattern agree or disagree; only the
+    first disagreements are kept as DatasetResult objects in results
+    """
+
+    def __init__(self, exoname):
+        super().__init__(exoname, 0)
+        self.agreed = 0
+        self.disagreed = 0
+
+    @property
+    def passed(self):
+        return self.agreed
+
+    @property
+    def failed(self):
+        return self.disagreed + (self.error is not None)
+
+    @property
+    def skipped(self):
+        return 0
+
+    @property
+    def grade(self):
+        """
+        the ratio of units where both patterns agree
+        """
+        total = self.agreed + self.disagreed
+        if self.error is not None or not total:
+            return 0.
+        return self.agreed / total
+
+
+class ExerciseRegexpCorpus(ExerciseRegexp):
+    """
+    a regexp exercise where the inputs come from a - possibly large - text file
+
+    with unit='line', the file is streamed, and both patterns are run
+    on each line, according to match_mode like with ExerciseRegexp;
+    with unit='buffer', the file is memory-mapped, and the spans found
+    by finditer() over the whole contents are compared; in that case the
+    pattern is encoded in utf-8 and applied on bytes, and spans are byte offsets
+
+    the correction shows how many lines - or matches - agree, and the
+    first max_shown disagreements; the results of the solution are computed
+    once, and again only if the file changes; timeout applies to the student pattern over the whole corpus,
+    and defaults to 10s
+
+    the first nb_examples lines are used as datasets, so that example() works
+    """
+
+    def __init__(self, name, regexp, path,              # pylint: disable=r0913
+                 *args, unit='line', max_shown=10, nb_examples=3,
+                 timeout=10., **keywords):
+        if unit not in ('line', 'buffer'):
+            raise ValueError(f"unit should be 'line' or 'buffer', not {unit}")
+        self.path = Path(path)
+        self.unit = unit
+        self.max_shown = max_shown
+        inputs = []
+        if unit == 'line':
+            inputs = [Args(line) for line in
+                      itertools.islice(self._lines(), nb_examples)]
+        super().__init__(name, regexp, inputs, *args, nb_examples=nb_examples,
+                         timeout=timeout, **keywords)
+        # the results of the solution, and the file state they were computed on
+        self._reference = None
+        self._reference_stamp = None
+
+    def bundle_key(self):
+        return f"{super().bundle_key()}:{self.unit}:{self.path}"
+
+    def _lines(self):
+        with self.path.open(encoding='utf-8', errors='replace', newline='') as feed:
+            for line in feed:
+                yield line.rstrip('\r\n')
+
+    @staticmethod
+    def _spans(regexp, buffer):
+        pattern = re.compile(regexp.encode('utf-8'))
+        for match in pattern.finditer(buffer):
+            yield match.span()
+
+    def student_solution(self, submission):
+        if self.unit == 'line':
+            return super().student_solution(submission)
+        try:
+            re.compile(submission)
+        except (re.error, TypeError) as exc:
+            raise InvalidSubmission(f"invalid regexp {submission!r} - "
+                                    f"{type(exc).__name__}: {exc}") from exc
+        return submission
+
+    def evaluate(self, student_function, fail_fast=False):
+        """
+        returns a CorpusEvaluation; with fail_fast, stops at the first disagreement
+        """
+        evaluation = CorpusEvaluation(self.name)
+        try:
+            student = self.student_solution(student_function)
+        except InvalidSubmission as exc:
+            evaluation.error = str(exc)
+            return evaluation
+        stat = self.path.stat()
+        stamp = (str(self.path), stat.st_mtime_ns, stat.st_size)
+        if self._reference is None or self._reference_stamp != stamp:
+            with self._contents() as contents:
+                self._reference = (
+                    [self.solution(line) for line in contents] if self.unit == 'line'
+                    else list(self._spans(self.regexp, contents)))
+            self._reference_stamp = stamp
+        try:
+            with self._contents() as contents, limited(self.timeout, self.memory_limit):
+                if self.unit == 'line':
+                    self._evaluate_lines(student, contents, evaluation, fail_fast)
+                else:
+                    self._evaluate_buffer(student, contents, evaluation, fail_fast)
+        except LimitExceeded as exc:
+            done = evaluation.agreed + evaluation.disagreed
+            evaluation.error = f"{exc} - after {done} {self.unit}(s)"
+        return evaluation
+
+    @contextmanager
+    def _contents(self):
+        """
+        the lines as an iterator, or the whole contents as a memory-mapped buffer
+        """
+        if self.unit == 'line':
+            lines = self._lines()
+            try:
+                yield lines
+            finally:
+                lines.close()
+        elif not self.path.stat().st_size:
+            # empty files can't be mapped
+            yield b""
+        else:
+            with self.path.open('rb') as feed, \
+                 mmap.mmap(feed.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield buffer
+
+    def _disagree(self, evaluation, index, dataset, expected, obtained):
+        evaluation.disagreed += 1
+        if len(evaluation.results) < self.max_shown:
+            evaluation.add(DatasetResult(expected, False, obtained, False,
+                                         index=index, dataset=dataset, ok=False))
+
+    def _evaluate_lines(self, student, lines, evaluation, fail_fast):
+        for index, (line, expected) in enumerate(zip(lines, self._reference)):
+            obtained = student(line)
+            if self.validate(expected, obtained):
+                evaluation.agreed += 1
+            else:
+                self._disagree(evaluation, index, line, expected, obtained)
+                if fail_fast:
+                    return
+
+    def _evaluate_buffer(self, regexp, buffer, evaluation, fail_fast):
+        expected_spans = iter(self._reference)
+        obtained_spans = self._spans(regexp, buffer)
+        # both are sorted, so a merge does it
+        expected, obtained = next(expected_spans, None), next(obtained_spans, None)
+        while expected is not None or obtained is not None:
+            if expected == obtained:
+                evaluation.agreed += 1
+                expected, obtained = next(expected_spans, None), next(obtained_spans, None)
+                continue
+            if obtained is None or (expected is not None and expected < obtained):
+                span, expected_found, obtained_found = expected, True, False
+                expected = next(expected_spans, None)
+            else:
+                span, expected_found, obtained_found = obtained, False, True
+                obtained = next(obtained_spans, None)
+            start, end = span
+            snippet = buffer[start:end].decode('utf-8', errors='replace')
+            self._disagree(evaluation, start, snippet, expected_found, obtained_found)
+            if fail_fast:
+                return
+
+    def correction(self, student_function, fail_fast=False):
+        """
+        a summary row, and the first disagreements
+        """
+        from ipywidgets import GridBox, Layout
+
+        evaluation = self.evaluate(student_function, fail_fast)
+        headers_props = {'font-size': self.header_font_size}
+        body_props = {'font-size': self.font_size}
+        unit_header = 'ligne' if self.unit == 'line' else 'position'
+        value_header = self.column_headers[1] if self.unit == 'line' else 'trouvé ?'
+        contents = [TextContent(x, css_properties=headers_props)
+                    .add_classes(['header', span_class])
+                    for (x, span_class) in zip((unit_header, value_header, 'obtenu'),
+                                               ("", "", "span-3-to-4"))]
+        contents.append(CssContent(CSS))
+
+        total = evaluation.agreed + evaluation.disagreed
+        summary = (evaluation.error if evaluation.error is not None
+                   else f"{self.path.name}: {evaluation.agreed} / {total} "
+                        f"{'lignes' if self.unit == 'line' else 'occurrences'} en accord")
+        if evaluation.disagreed > len(evaluation.results):
+            summary += f" - {len(evaluation.results)} premiers désaccords montrés"
+        result_content = ResultContent(evaluation.success)
+        contents.append(TextContent(summary)
+                        .add_classes(['cell', result_content.the_class(), 'span-1-to-3'])
+                        .add_css_properties(body_props))
+        contents.append(result_content.add_class('cell').add_css_properties(body_props))
+
+        for index, result in enumerate(evaluation):
+            classes = ['cell']
+            if index % 2 == 0:
+                classes.append('even')
+            # line numbers start at 1, positions at 0
+            where = result.index + 1 if self.unit == 'line' else result.index
+            contents.append(TextContent(truncate(f"{where}: {result.dataset}", 200))
+                            .set_is_code(True)
+                            .add_classes(classes).add_css_properties(body_props))
+            contents.append(self.result_renderer.render(result.expected)
+                            .add_classes(classes).add_class('ok')
+                            .add_css_properties(body_props))
+            contents.append(self.result_renderer.render(result.obtained)
+                            .add_classes(classes).add_class('ko')
+                            .add_css_properties(body_props))
+            contents.append(ResultContent(False)
+                            .add_classes(classes).add_css_properties(body_props))
+
+        log_correction(self.name, evaluation.success)
+        optional = {} if evaluation.error is None else dict(error=evaluation.error)
+        log2_correction(self.name, success=evaluation.success,
+                        passed=evaluation.passed, failed=evaluation.failed,
+                        skipped=0, **optional)
+
+        gridbox_layout = Layout(grid_template_columns='max-content 1fr 1fr max-content',
+                                max_width="100%")
+        return GridBox([content.widget() for content in contents],
+                       layout=gridbox_layout).add_class("nbae-fun")
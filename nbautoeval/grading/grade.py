@@ -0,0 +1,242 @@
+"""
+a command to grade student code, submitted as python modules,
+against the exercises defined in a python module or package
+
+inputs:
+* exercises: python modules - or packages - that define exercises
+* students: directories where to look for student modules (*.py);
+  the student name is the module name
+
+it will:
+* spot all the exercises - ExerciseFunction and subclasses - in the exercises modules
+* in each student module, look for the function - or regexp, or generator -
+  named after each exercise
+* evaluate them, with no rendering, in a pool of worker processes;
+  each student runs in a fresh worker process, so that the side effects of
+  a student module can't leak into the next ones
+* and produce a gradebook: JSON or CSV depending on the -o file extension
+* otherwise a plain text summary is written on the terminal
+
+the grade for one exercise is the ratio of passed datasets - see Evaluation.grade,
+that is redefined e.g. for ExerciseRegexpCorpus and ExerciseFunctionPerf;
+an exercise for which the student module has no function gets a 0;
+so does a student whose code kills its worker process
+
+WARNING:
+student code is run as-is, so this is best run in a sandboxed environment;
+the time spent on each dataset is bounded, see -t
+"""
+
+import io
+import sys
+import csv
+import json
+import importlib.util
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from contextlib import redirect_stdout
+from argparse import ArgumentParser, RawTextHelpFormatter
+from typing import Dict, List
+
+from ..precompute import modules_from_names, exercises_from_modules
+from ..parallel import process_pool
+from ..limits import limited
+
+Exoname = str                           # an exoname as per nbautoeval
+Student = str                           # plain text from filename
+Grades = Dict[Exoname, dict]            # details for one student
+
+
+# in each worker process, the exercises are loaded once
+_EXERCISES = []
+
+# for the exercises that do not set their own timeout
+DEFAULT_TIMEOUT = 10.
+
+
+def load_exercises(module_names, excludes=(), timeout=None):
+    """
+    the exercises to grade against, one per exoname;
+    timeout, if set, overrides the one of each exercise,
+    that otherwise defaults to DEFAULT_TIMEOUT
+    """
+    sys.path.insert(0, '')
+    exercises, exonames = [], set()
+    for exo in exercises_from_modules(modules_from_names(module_names), excludes):
+        # typically the same exercise with another rendering
+        if exo.name in exonames:
+            continue
+        exonames.add(exo.name)
+        # we are already in a worker process
+        exo.executor = None
+        if timeout:
+            exo.timeout = timeout
+        elif exo.timeout is None:
+            exo.timeout = DEFAULT_TIMEOUT
+        exercises.append(exo)
+    return exercises
+
+
+def _init_worker(module_names, excludes, timeout):
+    _EXERCISES.extend(load_exercises(module_names, excludes, timeout))
+
+
+def import_student(path, import_timeout):
+    spec = importlib.util.spec_from_file_location(f"nbae_student_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    with limited(import_timeout):
+        spec.loader.exec_module(module)
+    return module
+
+
+def grade_student(path, import_timeout=10, marker=None) -> Grades:
+    """
+    runs in a worker process; returns a dict exoname -> details
+
+    marker, if set, is a file that gets created on startup, so that
+    the caller can tell which students had started if the worker dies
+    """
+    if marker is not None:
+        Path(marker).touch()
+    grades = {}
+    # student code tends to be chatty
+    with redirect_stdout(io.StringIO()):
+        try:
+            module = import_student(path, import_timeout)
+        except (Exception, SystemExit) as exc:
+            error = f"cannot import: {type(exc).__name__}: {exc}"
+            return {exo.name: dict(grade=0, error=error) for exo in _EXERCISES}
+        for exo in _EXERCISES:
+            submission = getattr(module, exo.name, None)
+            if submission is None:
+                grades[exo.name] = dict(grade=0, error="missing")
+                continue
+            try:
+                evaluation = exo.evaluate(submission)
+            except (Exception, SystemExit) as exc:
+                grades[exo.name] = dict(grade=0, error=f"{type(exc).__name__}: {exc}")
+                continue
+            grades[exo.name] = dict(
+                grade=round(evaluation.grade, 4),
+                passed=evaluation.passed, failed=evaluation.failed)
+    return grades
+
+
+def grade_alone(path, module_names, excludes, timeout, import_timeout):
+    """
+    grades one student in a fresh process; returns None if that process dies
+    """
+    with process_pool(1, initializer=_init_worker,
+                      initargs=(module_names, excludes, timeout)) as pool:
+        try:
+            return pool.submit(grade_student, path, import_timeout).result()
+        except BrokenProcessPool:
+            return None
+
+
+def _grade_round(paths, markers, initargs, import_timeout, max_workers):
+    """
+    grades paths in one pool; returns a tuple (gradebook, started, pending)
+    where started are the students that were running when the pool broke,
+    and pending the ones that had not started yet
+    """
+    gradebook, started, pending = {}, [], []
+    with process_pool(max_workers, initializer=_init_worker, initargs=initargs,
+                      max_tasks_per_child=1) as pool:
+        futures = {path: pool.submit(grade_student, path, import_timeout, markers[path])
+                   for path in paths}
+        for path, future in futures.items():
+            student = path.stem
+            try:
+                gradebook[student] = future.result()
+            except BrokenProcessPool:
+                (started if markers[path].exists() else pending).append(path)
+            except Exception as exc:                    # pylint: disable=w0703
+                print(f"WARNING student {student} could not be graded - "
+                      f"{type(exc).__name__}: {exc}")
+    return gradebook, started, pending
+
+
+def grade_all(paths, module_names, *, excludes=(), timeout=None,
+              import_timeout=10, max_workers=None) -> Dict[Student, Grades]:
+    """
+    when a worker dies, the whole pool is broken; the students that were
+    running at that time are graded again, one at a time in a fresh process,
+    so as to spot the culprit; the ones that had not started yet
+    go to a new pool
+    """
+    gradebook = {}
+    initargs = (module_names, excludes, timeout)
+    with TemporaryDirectory() as tmpdir:
+        markers = {path: Path(tmpdir) / str(index)
+                   for index, path in enumerate(paths)}
+        pending = list(paths)
+        while pending:
+            graded, started, pending = _grade_round(
+                pending, markers, initargs, import_timeout, max_workers)
+            gradebook.update(graded)
+            for path in started:
+                grades = grade_alone(path, *initargs, import_timeout)
+                if grades is None:
+                    exonames = [exo.name for exo in load_exercises(module_names, excludes)]
+                    grades = {exoname: dict(grade=0, error="the worker process died")
+                              for exoname in exonames}
+                gradebook[path.stem] = grades
+    return gradebook
+
+
+def write_csv(gradebook, exonames: List[Exoname], output):
+    with Path(output).open('w', newline='') as writer:
+        csv_writer = csv.writer(writer)
+        csv_writer.writerow(['student', *exonames, 'total'])
+        for student, grades in sorted(gradebook.items()):
+            row = [grades.get(exoname, {}).get('grade', 0) for exoname in exonames]
+            csv_writer.writerow([student, *row, round(sum(row), 4)])
+
+
+def main():
+    parser = ArgumentParser(epilog=__doc__, formatter_class=RawTextHelpFormatter)
+    parser.add_argument("exercises", type=str,
+                        help="the python module or package that defines the exercises")
+    parser.add_argument("students", metavar='students', type=str, nargs="+",
+                        help="directories where to look for student modules")
+    parser.add_argument("-x", "--exclude", dest="excludes", default=[],
+                        action='append', type=str,
+                        help="exonames or variable names of exercises to skip")
+    parser.add_argument("-t", "--timeout", type=float, default=None,
+                        help=f"timeout in seconds for each dataset, overrides the one "
+                             f"of the exercises; default is {DEFAULT_TIMEOUT:.0f}s "
+                             f"for exercises that set none")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes, default is the number of cores")
+    parser.add_argument("-o", "--output",
+                        help="filename to store as JSON, or as CSV if it ends in .csv")
+    parser.add_argument("-v", "--verbose", action='store_true', default=False,
+                        help="print on terminal even if -o is provided")
+    args = parser.parse_args()
+
+    paths = sorted(path for root in args.students for path in Path(root).glob("*.py"))
+    if not paths:
+        print(f"no student module found in {args.students}")
+        exit(1)
+
+    exonames = [exo.name for exo in load_exercises([args.exercises], args.excludes)]
+    gradebook = grade_all(paths, [args.exercises], excludes=args.excludes,
+                          timeout=args.timeout, max_workers=args.jobs)
+
+    if args.output:
+        if args.output.endswith(".csv"):
+            write_csv(gradebook, exonames, args.output)
+        else:
+            with Path(args.output).open('w') as writer:
+                writer.write(json.dumps(gradebook) + "\n")
+    if not args.output or args.verbose:
+        for student, grades in sorted(gradebook.items()):
+            message = ""
+            for exoname in exonames:
+                message += f"{exoname}: {grades.get(exoname, {}).get('grade', 0):.2f} "
+            print(f"{student:^32}:  {message}")
+
+if __name__ == '__main__':
+    main()
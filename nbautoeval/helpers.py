@@ -1,4 +1,6 @@
 
+import time
+from contextlib import contextmanager
 from types import FunctionType, BuiltinFunctionType, BuiltinMethodType
 
 default_font_size='small'
@@ -31,3 +33,24 @@ def truncate(message: str, width):
     truncated = message if len(message) <= width \
         else message[:width-3]+'...'
     return truncated
+
+
+@contextmanager
+def timed(timings, key):
+    """
+    adds the time spent in the body, in seconds, to timings[key]
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] = timings.get(key, 0.) + time.perf_counter() - start
+
+
+def format_duration(seconds):
+    if seconds < 1e-3:
+        return f"{seconds*1e6:.0f} µs"
+    elif seconds < 1:
+        return f"{seconds*1e3:.1f} ms"
+    else:
+        return f"{seconds:.2f} s"
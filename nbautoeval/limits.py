@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111
+
+"""
+bounding the resources used by the students code
+
+limited() is a context manager that runs its body with
+* a wall-clock timeout, in seconds; this relies on SIGALRM, and so
+  is only available on unix, and in the main thread - which is where
+  the notebook code runs
+* a memory limit, in bytes; this is implemented by temporarily lowering
+  the address space limit of the process (RLIMIT_AS) to the current
+  size plus the allowed amount, and so is only available on linux
+
+when a limit is hit, the code is aborted and a LimitExceeded exception
+is raised by the context manager; these exceptions are rendered as a
+specific cell by the default renderer
+"""
+
+import os
+import time
+import signal
+import threading
+import contextlib
+from contextlib import contextmanager
+
+from .content import TextContent
+
+
+class LimitExceeded(Exception):
+    """
+    the base class for when the students code exceeds a limit
+    """
+
+    def _render_content_(self):
+        return (TextContent(str(self))
+                .add_css_properties({'align-self': 'center'})
+                .add_class('limit-exceeded'))
+
+
+class TimeoutExceeded(LimitExceeded):
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        super().__init__(timeout)
+
+    def __str__(self):
+        return f"timeout - aborted after {self.timeout}s"
+
+
+class MemoryExceeded(LimitExceeded):
+
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        super().__init__(memory_limit)
+
+    def __str__(self):
+        return f"memory exceeded - more than {self.memory_limit / 2**20:.0f} MiB"
+
+
+# this is what the alarm handler raises; it is not an Exception
+# so that the students code won't catch it with a plain 'except Exception'
+class _Interrupt(BaseException):
+    pass
+
+
+_WARNED = set()
+
+def _warn_once(key, message):
+    if key not in _WARNED:
+        _WARNED.add(key)
+        print(f"WARNING: {message}")
+
+
+########## timeout
+# once the deadline has passed, the alarm goes off again at that interval
+# until the with block is done, as the students code may well catch
+# the first interruption with a bare 'except:'
+ALARM_INTERVAL = 0.05
+
+
+def _on_alarm(_signum, frame):
+    # no need to interrupt limited() itself while it is cleaning up
+    while frame is not None:
+        if frame.f_code in _CLEANUP_CODES:
+            return
+        frame = frame.f_back
+    raise _Interrupt()
+
+
+def _start_timer(timeout):
+    """
+    returns the state to be restored by _stop_timer, or None
+    """
+    if not hasattr(signal, 'setitimer'):
+        _warn_once('timeout', "timeout not supported on this platform - ignored")
+        return None
+    if threading.current_thread() is not threading.main_thread():
+        _warn_once('thread', "timeout only supported in the main thread - ignored")
+        return None
+    # whether the alarm went off at all
+    fired = []
+    def on_alarm(signum, frame):
+        fired.append(True)
+        _on_alarm(signum, frame)
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    # when nested in another limited(), do not go beyond the outer deadline
+    delay, _ = signal.getitimer(signal.ITIMER_REAL)
+    clipped = bool(delay) and delay < timeout
+    previous_timer = signal.setitimer(signal.ITIMER_REAL,
+                                      delay if clipped else timeout,
+                                      ALARM_INTERVAL)
+    return previous_handler, previous_timer, time.monotonic(), fired, clipped
+
+
+def _stop_timer(state):
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    previous_handler, (delay, interval), started, *_ = state
+    signal.signal(signal.SIGALRM, previous_handler)
+    # re-arm any timer that was running before us
+    if delay:
+        remaining = max(delay - (time.monotonic() - started), 0.001)
+        signal.setitimer(signal.ITIMER_REAL, remaining, interval)
+
+
+########## memory
+def _address_space():
+    """
+    the current size of the process address space in bytes, or None
+    """
+    try:
+        with open("/proc/self/statm") as feed:
+            pages = int(feed.read().split()[0])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def _lower_memory(memory_limit):
+    """
+    returns the limits to be restored by _restore_memory, or None
+    """
+    try:
+        import resource
+    except ModuleNotFoundError:
+        _warn_once('memory', "memory limit not supported on this platform - ignored")
+        return None
+    size = _address_space()
+    if size is None:
+        _warn_once('memory', "memory limit not supported on this platform - ignored")
+        return None
+    previous = soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = size + memory_limit
+    for bound in soft, hard:
+        if bound != resource.RLIM_INFINITY:
+            limit = min(limit, bound)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    return previous
+
+
+def _restore_memory(previous):
+    import resource
+    resource.setrlimit(resource.RLIMIT_AS, previous)
+
+
+@contextmanager
+def limited(timeout=None, memory_limit=None):
+    """
+    a context manager to run code with a timeout in seconds,
+    and/or a memory limit in bytes - None meaning no limit
+
+    raises TimeoutExceeded or MemoryExceeded
+    """
+    if not timeout and not memory_limit:
+        yield
+        return
+    memory_state = _lower_memory(memory_limit) if memory_limit else None
+    timer_state = _start_timer(timeout) if timeout else None
+    try:
+        yield
+        # the students code may have caught all the interruptions
+        if timer_state is not None and timer_state[3]:
+            raise _Interrupt()
+    except _Interrupt:
+        # the deadline that expired is the one of an enclosing limited()
+        if timer_state is None or timer_state[4]:
+            raise
+        raise TimeoutExceeded(timeout) from None
+    except MemoryError:
+        if memory_state is None:
+            raise
+        raise MemoryExceeded(memory_limit) from None
+    finally:
+        if timer_state is not None:
+            _stop_timer(timer_state)
+        if memory_state is not None:
+            _restore_memory(memory_state)
+
+
+# the frames where _on_alarm does not interrupt
+_CLEANUP_CODES = {
+    limited.__wrapped__.__code__,
+    contextlib._GeneratorContextManager.__exit__.__code__, # pylint: disable=w0212
+}
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111
+
+"""
+helpers for running exercise code in worker processes
+
+the general idea is that all the code that is shipped to a worker
+must be picklable; functions are pickled by reference, so it is
+important to use the 'fork' start method whenever possible, so that
+functions that were defined in the notebook - i.e. in __main__ - can
+be found in the workers as well
+"""
+
+import sys
+import pickle
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+EXECUTORS = (None, 'serial', 'process')
+
+
+def check_executor(executor):
+    if executor not in EXECUTORS:
+        raise ValueError(f"unknown executor {executor} - should be one of {EXECUTORS}")
+    return executor
+
+
+def mp_context():
+    """
+    the multiprocessing context to use; fork when available
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def process_pool(max_workers=None, initializer=None, initargs=(),
+                 max_tasks_per_child=None):
+    """
+    with max_tasks_per_child, workers are replaced after that many tasks;
+    these workers are spawned, as this is not available with fork,
+    and it requires python-3.11 - it is ignored on older versions
+    """
+    if max_tasks_per_child is None or sys.version_info < (3, 11):
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context(),
+                                   initializer=initializer, initargs=initargs)
+    return ProcessPoolExecutor(max_workers=max_workers,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=initializer, initargs=initargs,
+                               max_tasks_per_child=max_tasks_per_child)
+
+
+def unpicklable(obj):
+    """
+    returns None if obj can be pickled, and the exception raised otherwise
+    """
+    try:
+        pickle.dumps(obj)
+        return None
+    except Exception as exc:                            # pylint: disable=w0703
+        return exc
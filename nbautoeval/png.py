@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111
+
+"""
+encoding numpy arrays as PNG images, without matplotlib
+
+this mimics matplotlib's imsave():
+* 2d arrays are normalized between their min and max values,
+  and go through a colormap - viridis by default; NaN values are transparent
+* 3d arrays of shape (h, w, 3) or (h, w, 4) are taken as RGB or RGBA,
+  with floats in [0, 1] or integers in [0, 255]
+
+colormaps are applied with a lookup table; viridis and gray are built in,
+other colormaps are fetched from matplotlib if it is installed
+
+images larger than max_size pixels are downsampled - keeping one pixel out
+of n - before encoding; the encoded images are cached, keyed by a hash
+of the array contents
+"""
+
+import base64
+import hashlib
+import struct
+import zlib
+
+import numpy as np
+
+
+# viridis sampled at 33 evenly spaced points, from matplotlib (CC0)
+VIRIDIS = (
+    (0.2670, 0.0049, 0.3294), (0.2770, 0.0503, 0.3757),
+    (0.2823, 0.0950, 0.4173), (0.2829, 0.1359, 0.4534),
+    (0.2788, 0.1755, 0.4834), (0.2706, 0.2141, 0.5071),
+    (0.2590, 0.2515, 0.5247), (0.2450, 0.2877, 0.5373),
+    (0.2297, 0.3224, 0.5457), (0.2143, 0.3556, 0.5512),
+    (0.1994, 0.3876, 0.5546), (0.1856, 0.4186, 0.5568),
+    (0.1727, 0.4488, 0.5579), (0.1607, 0.4785, 0.5581),
+    (0.1490, 0.5081, 0.5573), (0.1378, 0.5375, 0.5549),
+    (0.1276, 0.5669, 0.5506), (0.1206, 0.5964, 0.5436),
+    (0.1206, 0.6258, 0.5335), (0.1323, 0.6550, 0.5197),
+    (0.1579, 0.6838, 0.5017), (0.1966, 0.7118, 0.4792),
+    (0.2461, 0.7389, 0.4520), (0.3041, 0.7647, 0.4199),
+    (0.3692, 0.7889, 0.3829), (0.4401, 0.8111, 0.3410),
+    (0.5160, 0.8312, 0.2943), (0.5958, 0.8487, 0.2433),
+    (0.6785, 0.8637, 0.1895), (0.7624, 0.8764, 0.1371),
+    (0.8456, 0.8873, 0.0997), (0.9261, 0.8973, 0.1041),
+    (0.9932, 0.9062, 0.1439),
+)
+
+LUT_SIZE = 256
+
+
+def _interpolate(anchors):
+    anchors = np.array(anchors)
+    positions = np.linspace(0, 1, len(anchors))
+    samples = np.linspace(0, 1, LUT_SIZE)
+    channels = [np.interp(samples, positions, anchors[:, i])
+                for i in range(anchors.shape[1])]
+    return np.round(np.stack(channels, axis=1) * 255).astype(np.uint8)
+
+
+# key -> (cmap, lut); keeping the colormap objects alive
+# ensures that their id() is not reused by another one
+_LUTS = {}
+
+def lookup_table(cmap):
+    """
+    a (256, 3) uint8 array for that colormap - a name,
+    or a matplotlib Colormap object
+    """
+    if cmap is None:
+        cmap = 'viridis'
+    key = cmap if isinstance(cmap, str) else id(cmap)
+    if key in _LUTS:
+        return _LUTS[key][1]
+    colormap = cmap
+    if cmap == 'viridis':
+        lut = _interpolate(VIRIDIS)
+    elif cmap in ('gray', 'grey', 'Greys_r'):
+        lut = _interpolate(((0, 0, 0), (1, 1, 1)))
+    elif cmap in ('gray_r', 'grey_r', 'Greys', 'binary'):
+        lut = _interpolate(((1, 1, 1), (0, 0, 0)))
+    else:
+        try:
+            if isinstance(cmap, str):
+                import matplotlib
+                cmap = matplotlib.colormaps[cmap]
+            rgba = np.asarray(cmap(np.linspace(0, 1, LUT_SIZE)))
+            lut = np.round(rgba[:, :3] * 255).astype(np.uint8)
+        except Exception as exc:                    # pylint: disable=w0703
+            print(f"WARNING: colormap {cmap} not available ({type(exc).__name__}: {exc})"
+                  f" - using viridis")
+            lut = lookup_table('viridis')
+    _LUTS[key] = colormap, lut
+    return lut
+
+
+def to_pixels(array, cmap=None, vmin=None, vmax=None):
+    """
+    turns an array into a (h, w, 3) or (h, w, 4) uint8 array
+    """
+    if array.ndim == 2:
+        values = array.astype(np.float64) if array.dtype.kind in 'biu' else array
+        if vmin is None:
+            vmin, vmax = np.nanmin(values), np.nanmax(values)
+        span = (vmax - vmin) or 1
+        nans = np.isnan(values)
+        indices = np.nan_to_num((values - vmin) * ((LUT_SIZE - 1) / span))
+        indices = np.clip(indices, 0, LUT_SIZE - 1).astype(np.uint8)
+        pixels = lookup_table(cmap)[indices]
+        if nans.any():
+            alpha = np.where(nans, 0, 255).astype(np.uint8)
+            pixels = np.concatenate([pixels, alpha[:, :, None]], axis=2)
+        return pixels
+    if array.ndim == 3 and array.shape[2] in (3, 4):
+        if array.dtype.kind == 'f':
+            return np.round(np.clip(np.nan_to_num(array), 0, 1) * 255).astype(np.uint8)
+        return np.clip(array, 0, 255).astype(np.uint8)
+    raise ValueError(f"cannot make an image from an array of shape {array.shape}")
+
+
+def _chunk(kind, data):
+    chunk = kind + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def encode(pixels, level=6):
+    """
+    the PNG bytes for a (h, w, 3) or (h, w, 4) uint8 array
+    """
+    height, width, channels = pixels.shape
+    color_type = 2 if channels == 3 else 6
+    # each row is prefixed with its filter type, 0 for none
+    raw = np.zeros((height, 1 + width * channels), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, -1)
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(raw.tobytes(), level))
+            + _chunk(b"IEND", b""))
+
+
+def downsample(array, max_size):
+    """
+    keep one pixel out of n in both directions,
+    so that the result is no larger than max_size
+    """
+    step = -(-max(array.shape[:2]) // max_size)
+    return array[::step, ::step] if step > 1 else array
+
+
+_CACHE = {}
+CACHE_SIZE = 256
+
+def png_base64(array, cmap=None, max_size=1024):
+    """
+    the base64-encoded PNG image for that array, as a str
+    """
+    if array.dtype.kind == 'b':
+        array = array.astype(np.uint8)
+    # the normalization is done on the whole array
+    vmin = vmax = None
+    if array.ndim == 2:
+        vmin, vmax = np.nanmin(array), np.nanmax(array)
+    array = np.ascontiguousarray(downsample(array, max_size))
+    hasher = hashlib.sha1(array.view(np.uint8).reshape(-1) if array.size else b"")
+    hasher.update(repr((array.shape, array.dtype.str, vmin, vmax)).encode())
+    # the colors themselves, whatever the colormap object
+    if array.ndim == 2:
+        hasher.update(lookup_table(cmap).tobytes())
+    key = hasher.hexdigest()
+    if key not in _CACHE:
+        if len(_CACHE) >= CACHE_SIZE:
+            del _CACHE[next(iter(_CACHE))]
+        png = encode(to_pixels(array, cmap, vmin, vmax))
+        _CACHE[key] = base64.b64encode(png).decode(encoding="ascii")
+    return _CACHE[key]
@@ -0,0 +1,89 @@
+"""
+a command to precompute the expected results of exercises into a bundle
+
+inputs:
+* modules: python modules - or packages - that define exercises
+
+it will:
+* import the modules, and the submodules of packages
+* spot all the ExerciseFunction instances - this includes
+  ExerciseGenerator and ExerciseRegexp - and ExerciseClass instances defined there
+* run their solution on all their datasets, or record the transcripts
+  of their scenarios
+* and store the results in a bundle file (-o)
+
+exercises that can't be run - e.g. infinite generators with no max_iterations -
+can be skipped with -x, using either their exoname or their variable name
+
+in the students environment, the bundle can then be declared either
+* with the NBAUTOEVAL_BUNDLE env. variable, or
+* by calling nbautoeval.use_bundle(path), e.g. in the package __init__.py
+
+the current directory is added to sys.path, so that e.g.
+  nbae-precompute exercises -o exercises/results.nbae
+works from the root of a course repo
+"""
+
+import sys
+import pkgutil
+import importlib
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+from .exercise_function import ExerciseFunction
+from .exercise_class import ExerciseClass
+from .bundle import write_bundle
+
+
+def modules_from_names(names):
+    for name in names:
+        module = importlib.import_module(name)
+        yield module
+        if hasattr(module, '__path__'):
+            for info in pkgutil.walk_packages(module.__path__, prefix=f"{name}."):
+                yield importlib.import_module(info.name)
+
+
+def exercises_from_modules(modules, excludes=(), kinds=(ExerciseFunction,)):
+    """
+    all the exercises - instances of kinds - defined in these modules,
+    each one only once, and in the order they are found
+    """
+    seen = set()
+    for module in modules:
+        for varname, value in vars(module).items():
+            if not isinstance(value, kinds) or id(value) in seen:
+                continue
+            seen.add(id(value))
+            if varname in excludes or value.name in excludes:
+                continue
+            yield value
+
+
+def main():
+    parser = ArgumentParser(epilog=__doc__, formatter_class=RawTextHelpFormatter)
+    parser.add_argument("modules", metavar='modules', type=str, nargs="+",
+                        help="python modules or packages that define exercises")
+    parser.add_argument("-o", "--output", default="results.nbae",
+                        help="the bundle file to create")
+    parser.add_argument("-x", "--exclude", dest="excludes", default=[],
+                        action='append', type=str,
+                        help="exonames or variable names of exercises to skip")
+    parser.add_argument("-v", "--verbose", action='store_true', default=False,
+                        help="list the exercises found")
+    args = parser.parse_args()
+
+    sys.path.insert(0, '')
+    exercises = list(exercises_from_modules(
+        modules_from_names(args.modules), args.excludes,
+        kinds=(ExerciseFunction, ExerciseClass)))
+    if args.verbose:
+        for exo in exercises:
+            if isinstance(exo, ExerciseClass):
+                print(f"{exo.name}: {len(exo.scenarios)} scenarios")
+            else:
+                print(f"{exo.name}: {len(exo.datasets)} datasets")
+    stored = write_bundle(args.output, exercises)
+    print(f"{args.output}: stored {stored} results from {len(exercises)} exercises")
+
+if __name__ == '__main__':
+    main()
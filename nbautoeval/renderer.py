@@ -1,4 +1,5 @@
 import pprint
+import itertools
 
 from .content import TextContent, ImshowContent
 
@@ -35,17 +36,131 @@ class Renderer:
         return f"<Renderer {type(self)}>"
 
 
+# marks the place of the elided items in a container
+_ELIDED = object()
+
+
+def preview(python_object, max_chars=2000, head=10, tail=3):
+    """
+    a bounded version of repr(python_object)
+
+    returns a tuple (text, truncated)
+
+    when repr() fits in max_chars, this is the same as repr(); otherwise
+    large builtin containers only show their first head and last tail items,
+    with the number of items; long strings and reprs are cut, with their size;
+    formatting stops once max_chars characters are produced
+    """
+    # a first pass with no elision, that stops as soon as the budget is spent
+    budget = [max_chars]
+    elide = [False]
+
+    def spend(text):
+        budget[0] -= len(text)
+        return text
+
+    def fmt(obj):
+        kind = type(obj)
+        if kind in (str, bytes):
+            if len(obj) <= budget[0]:
+                return spend(repr(obj)), False
+            kept = max(budget[0] // 2, 1)
+            return spend(f"{obj[:kept]!r}...<{len(obj)} {'chars' if kind is str else 'bytes'}>"), True
+        if kind in (list, tuple, set, frozenset, dict):
+            return fmt_container(obj)
+        text = repr(obj)
+        if len(text) <= budget[0]:
+            return spend(text), False
+        kept = max(budget[0], 1)
+        return spend(f"{text[:kept]}...<{len(text)} chars>"), True
+
+    def fmt_container(obj):
+        kind = type(obj)
+        size = len(obj)
+        truncated = elide[0] and size > head + tail
+        if not truncated:
+            items = obj
+        elif kind in (list, tuple):
+            items = [*obj[:head], _ELIDED, *obj[size-tail:]]
+        else:
+            # no cheap way to get the last items of a set or dict
+            items = [*itertools.islice(obj, head), _ELIDED]
+        parts = []
+        for item in items:
+            if budget[0] <= 0:
+                parts.append(spend("..."))
+                truncated = True
+                break
+            if item is _ELIDED:
+                parts.append(spend("..."))
+                continue
+            if kind is dict:
+                key, key_truncated = fmt(item)
+                value, value_truncated = fmt(obj[item])
+                text, item_truncated = f"{key}: {value}", key_truncated or value_truncated
+            else:
+                text, item_truncated = fmt(item)
+            truncated = truncated or item_truncated
+            parts.append(text)
+            spend(", ")
+        inside = ", ".join(parts)
+        if kind is list:
+            text = f"[{inside}]"
+        elif kind is tuple:
+            text = f"({inside},)" if size == 1 else f"({inside})"
+        elif kind is dict:
+            text = f"{{{inside}}}"
+        elif not size:
+            text = f"{kind.__name__}()"
+        else:
+            text = f"{{{inside}}}" if kind is set else f"frozenset({{{inside}}})"
+        if elide[0] and size > head + tail:
+            text += f" <{size} items>"
+        return text, truncated
+
+    text, truncated = fmt(python_object)
+    if not truncated:
+        return text, truncated
+    budget[0], elide[0] = max_chars, True
+    return fmt(python_object)
+
+
+class SizeAwareRenderer(Renderer):
+    """
+    the default renderer; same as Renderer, except that large objects
+    are shown as a bounded preview - see preview() - instead of their full repr()
+    """
+
+    def __init__(self, *, max_chars=2000, head=10, tail=3):
+        super().__init__()
+        self.max_chars = max_chars
+        self.head = head
+        self.tail = tail
+
+    def render(self, python_object):
+        if hasattr(python_object, "_render_content_"):
+            return python_object._render_content_()
+        text, _ = preview(python_object, self.max_chars, self.head, self.tail)
+        return (TextContent(text)
+                .add_css_properties({'align-self': 'center'})
+                .set_is_code(not isinstance(python_object, Exception)))
+
+
 class PPrintRenderer(Renderer):
     # the default for compact with pprint is False, but we favour True
-    def __init__(self, *, width=80, indent=2, compact=True):
+    # objects larger than max_chars are shown as a preview, see preview()
+    def __init__(self, *, width=80, indent=2, compact=True, max_chars=2000):
         self.width = width
         self.indent = indent
         self.compact = compact
+        self.max_chars = max_chars
 
     def render(self, python_object):
-        return (TextContent(
-                    pprint.pformat(python_object, compact=self.compact,
-                                   indent=self.indent, width=self.width))
+        text, truncated = preview(python_object, self.max_chars)
+        if not truncated:
+            text = pprint.pformat(python_object, compact=self.compact,
+                                  indent=self.indent, width=self.width)
+        return (TextContent(text)
                     .add_css_properties({'align-self': 'center'})
                     .set_is_code(True))
 
@@ -68,7 +183,6 @@ class ImshowRenderer(PPrintRenderer):
     def render(self, python_object):
         try:
             import numpy as np
-            import matplotlib
             # empty ndarrays cannot be imshow'ed
             if isinstance(python_object, np.ndarray) and python_object.size:
                 return (ImshowContent(python_object, self.css_width, self.cmap)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111, r0902, r0913
+
+"""
+the outcome of a correction, as plain python objects
+
+this is what evaluate() returns, and what correction() renders;
+these objects do not depend on ipywidgets, and are picklable as long
+as the data they hold is, so they can be used outside of a notebook
+"""
+
+
+class DatasetResult:
+    """
+    the outcome of running one dataset, with
+    * index, dataset: the dataset and its position in the exercise
+    * expected, obtained: the results of the solution and of the student code;
+      if an exception was raised, it is returned as the result, and
+      ref_exc or stu_exc is set accordingly
+    * ok: the outcome of validate(), None if not yet validated
+    * mismatch: when validate() returned a Mismatch object, see validation.py
+    * timings: a dict of durations in seconds, with keys among
+      clone, solution, student, validate and render
+    """
+
+    def __init__(self, expected, ref_exc, obtained, stu_exc,
+                 *, index=None, dataset=None, ok=None, timings=None, mismatch=None):
+        self.index = index
+        self.dataset = dataset
+        self.expected = expected
+        self.ref_exc = ref_exc
+        self.obtained = obtained
+        self.stu_exc = stu_exc
+        self.ok = ok
+        self.mismatch = mismatch
+        self.timings = timings if timings is not None else {}
+
+    def __repr__(self):
+        status = "?" if self.ok is None else "OK" if self.ok else "KO"
+        return f"<DatasetResult #{self.index} {status}>"
+
+    @property
+    def exception(self):
+        """
+        the exception raised by the student code, or None
+        """
+        return self.obtained if self.stu_exc else None
+
+    def to_dict(self):
+        """
+        a json-friendly summary, where results appear as their repr()
+        """
+        return dict(index=self.index, ok=self.ok,
+                    expected=repr(self.expected), obtained=repr(self.obtained),
+                    exception=(repr(self.exception)
+                               if self.exception is not None else None),
+                    mismatch=str(self.mismatch) if self.mismatch is not None else None,
+                    timings=self.timings)
+
+
+class StepResult:
+    """
+    the outcome of one step in a class scenario, with
+    * expected, obtained: the results for the solution and for the student class;
+      on the first step - the creation of both objects - these are their repr()
+    * ok: whether they match
+    * error: a message, set instead when the step could not be run at all,
+      e.g. when the objects can't be created
+    * timings: same as in DatasetResult
+    """
+
+    def __init__(self, expected, obtained, ok, *, error=None, timings=None):
+        self.expected = expected
+        self.obtained = obtained
+        self.ok = ok
+        self.error = error
+        self.timings = timings if timings is not None else {}
+
+    def __repr__(self):
+        status = "OK" if self.ok else "KO"
+        return f"<StepResult {status}>"
+
+
+class Evaluation:
+    """
+    the outcome of a whole correction, made of DatasetResult objects
+
+    when using fail_fast, the datasets that were not run are
+    counted as skipped
+
+    error is set when the submission could not be run at all,
+    e.g. a regexp that does not compile; it counts as one failure,
+    like the single error row shown in the correction
+    """
+
+    def __init__(self, exoname, nb_datasets):
+        self.exoname = exoname
+        self.nb_datasets = nb_datasets
+        self.results = []
+        self.error = None
+
+    def __repr__(self):
+        return (f"<Evaluation {self.exoname} passed={self.passed} "
+                f"failed={self.failed} skipped={self.skipped}>")
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def add(self, result):
+        self.results.append(result)
+
+    @property
+    def passed(self):
+        return sum(1 for result in self.results if result.ok)
+
+    @property
+    def failed(self):
+        return len(self.results) - self.passed + (self.error is not None)
+
+    @property
+    def skipped(self):
+        return max(self.nb_datasets - len(self.results) - (self.error is not None), 0)
+
+    @property
+    def success(self):
+        return self.error is None and self.failed == 0
+
+    @property
+    def grade(self):
+        """
+        a number between 0 and 1, here the ratio of passed datasets
+        """
+        if not self.nb_datasets:
+            return float(self.success)
+        return self.passed / self.nb_datasets
+
+    @property
+    def timings(self):
+        """
+        the timings of all results, summed up per key
+        """
+        return total_timings(result.timings for result in self.results)
+
+    def to_dict(self):
+        return dict(exoname=self.exoname, success=self.success, error=self.error,
+                    passed=self.passed, failed=self.failed, skipped=self.skipped,
+                    grade=self.grade, timings=self.timings,
+                    results=[result.to_dict() for result in self.results])
+
+
+def total_timings(timings_list, digits=None):
+    """
+    sums up a collection of timings dicts, per key;
+    durations are rounded if digits is provided
+    """
+    totals = {}
+    for timings in timings_list:
+        for key, duration in timings.items():
+            totals[key] = totals.get(key, 0.) + duration
+    if digits is not None:
+        totals = {key: round(duration, digits) for (key, duration) in totals.items()}
+    return totals
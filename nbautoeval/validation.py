@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+# pylint: disable=c0111, r0913
+
+"""
+helpers for comparing results, for use in validate() methods
+
+validate() may return a Mismatch object instead of False; it is falsy,
+and it carries a message that explains where the results differ,
+that gets displayed in the correction
+"""
+
+import itertools
+from collections import deque
+
+
+class Mismatch:
+    """
+    a falsy object that describes why two results differ
+
+    index is the position of the first difference, if relevant
+
+    diff is an optional, small, object that shows the differences;
+    when set, it is rendered in the correction instead of the obtained result
+    """
+
+    def __init__(self, message, index=None, expected=None, obtained=None, diff=None):
+        self.message = message
+        self.index = index
+        self.expected = expected
+        self.obtained = obtained
+        self.diff = diff
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"<Mismatch {self}>"
+
+    def __str__(self):
+        if self.index is None:
+            return self.message
+        return (f"{self.message} at index {self.index}: "
+                f"expected {self.expected!r}, got {self.obtained!r}")
+
+
+# numpy kinds that are compared with a tolerance
+INEXACT_KINDS = 'fc'
+NUMERIC_KINDS = 'biufc'
+
+
+def compare_arrays(expected, obtained, *, rtol=1e-05, atol=1e-08,
+                   equal_nan=False, chunk_size=2**20):
+    """
+    compares 2 numpy arrays, and returns either True or a Mismatch instance
+
+    shapes must be equal - no broadcasting - and dtypes must be comparable;
+    floating point values are compared with np.isclose(rtol, atol, equal_nan),
+    other types with ==
+
+    the comparison is done chunk by chunk, in C order, so that the temporary
+    arrays hold at most chunk_size elements whatever the shape of the arrays,
+    and it stops at the first chunk that has a difference
+    """
+    import numpy as np
+
+    if expected.shape != obtained.shape:
+        return Mismatch(f"wrong shape {obtained.shape}, expected {expected.shape}")
+    kinds = expected.dtype.kind, obtained.dtype.kind
+    numeric = [kind in NUMERIC_KINDS for kind in kinds]
+    if numeric[0] != numeric[1]:
+        return Mismatch(f"wrong dtype {obtained.dtype}, expected {expected.dtype}")
+    tolerant = any(kind in INEXACT_KINDS for kind in kinds)
+
+    def chunk_ok(expected_chunk, obtained_chunk):
+        if tolerant:
+            return np.isclose(expected_chunk, obtained_chunk,
+                              rtol=rtol, atol=atol, equal_nan=equal_nan)
+        return np.asarray(expected_chunk == obtained_chunk)
+
+    if expected.ndim == 0 or expected.size == 0:
+        if expected.size == 0 or chunk_ok(expected, obtained).all():
+            return True
+        return Mismatch(f"expected {expected[()]!r}, got {obtained[()]!r}")
+
+    # the arrays are scanned in C order, through buffers of chunk_size elements,
+    # whatever their shape and memory layout
+    scan = np.nditer([expected, obtained], order='C', buffersize=chunk_size,
+                     flags=['external_loop', 'buffered', 'zerosize_ok', 'refs_ok'])
+    start = 0
+    for expected_chunk, obtained_chunk in scan:
+        oks = chunk_ok(expected_chunk, obtained_chunk)
+        if not oks.all():
+            index = np.unravel_index(start + int(np.argmin(oks)), expected.shape)
+            index = tuple(int(i) for i in index)
+            return Mismatch("different values", index, expected[index], obtained[index])
+        start += len(expected_chunk)
+    return True
+
+
+def _same_cells(left, right):
+    """
+    whether 2 cells of a frame are equal, like DataFrame.equals() does it
+    """
+    import pandas as pd
+    try:
+        if left is right or bool(left == right):
+            return True
+    except Exception:                                   # pylint: disable=w0703
+        # e.g. arrays in the cells
+        return False
+    try:
+        return bool(pd.isna(left) and pd.isna(right))
+    except Exception:                                   # pylint: disable=w0703
+        return False
+
+
+def compare_frames(expected, obtained, *, rtol=0., atol=0., max_rows=10):
+    """
+    compares 2 pandas DataFrame - or Series - objects,
+    and returns either True or a Mismatch instance
+
+    the schema - type, shape, index, columns and dtypes - is checked first;
+    then rows are compared through their hashes - see pandas.util.hash_pandas_object -
+    and the rows whose hashes differ are then compared value by value;
+    with a non-zero rtol or atol, floating point columns are compared with
+    np.isclose instead; NaN values are considered equal, like with equals()
+
+    when rows differ, the Mismatch has a diff attribute, that is a DataFrame
+    made of at most max_rows of these rows, and of the columns that differ
+    """
+    import numpy as np
+    import pandas as pd
+
+    if type(expected) is not type(obtained):
+        return Mismatch(f"expected a {type(expected).__name__}, "
+                        f"got a {type(obtained).__name__}")
+    if expected.shape != obtained.shape:
+        return Mismatch(f"wrong shape {obtained.shape}, expected {expected.shape}")
+    if not expected.index.equals(obtained.index):
+        return Mismatch("different index")
+    # work on frames from now on
+    if isinstance(expected, pd.Series):
+        if expected.name != obtained.name:
+            return Mismatch(f"wrong name {obtained.name!r}, expected {expected.name!r}")
+        expected, obtained = expected.to_frame(), obtained.to_frame()
+    if not expected.columns.equals(obtained.columns):
+        return Mismatch(f"wrong columns {list(obtained.columns)}, "
+                        f"expected {list(expected.columns)}")
+    if not expected.dtypes.equals(obtained.dtypes):
+        columns = [column for column in expected.columns
+                   if expected[column].dtype != obtained[column].dtype]
+        return Mismatch(f"wrong dtype in column(s) {', '.join(map(str, columns))}")
+
+    tolerant = rtol or atol
+    floats = {i for (i, dtype) in enumerate(expected.dtypes) if dtype.kind == 'f'} \
+        if tolerant else set()
+
+    def confirmed(expected, obtained, columns):
+        """
+        a boolean mask of the rows that do differ on these columns,
+        as per ==, and with NaN values considered equal
+        """
+        mask = np.zeros(len(expected), dtype=bool)
+        for i in columns:
+            left, right = expected.iloc[:, i].values, obtained.iloc[:, i].values
+            if isinstance(left, np.ndarray) and left.dtype.kind in NUMERIC_KINDS + 'mM':
+                same = (left == right) | (pd.isna(left) & pd.isna(right))
+            else:
+                same = np.array([_same_cells(x, y) for (x, y) in zip(left, right)],
+                                dtype=bool)
+            mask |= ~same
+        return mask
+
+    def differing(expected, obtained, columns):
+        """
+        a boolean mask of the rows that differ on these columns
+        """
+        mask = np.zeros(len(expected), dtype=bool)
+        hashed = [i for i in columns if i not in floats]
+        if hashed:
+            # the hashes only tell which rows may differ, e.g. 0. and -0.,
+            # or 1 and 1. in an object column, are equal but hash differently
+            candidates = np.flatnonzero(
+                pd.util.hash_pandas_object(expected.iloc[:, hashed], index=False).values
+                != pd.util.hash_pandas_object(obtained.iloc[:, hashed], index=False).values)
+            if len(candidates):
+                mask[candidates] = confirmed(expected.iloc[candidates],
+                                             obtained.iloc[candidates], hashed)
+        for i in columns:
+            if i in floats:
+                mask |= ~np.isclose(expected.iloc[:, i].values, obtained.iloc[:, i].values,
+                                    rtol=rtol, atol=atol, equal_nan=True)
+        return mask
+
+    all_columns = range(expected.shape[1])
+    try:
+        rows = np.flatnonzero(differing(expected, obtained, all_columns))
+    except TypeError:
+        # e.g. unhashable objects in the cells
+        return True if expected.equals(obtained) else Mismatch("different values")
+    if not len(rows):
+        return True
+
+    # only the first rows go in the diff
+    expected_rows = expected.iloc[rows[:max_rows]]
+    obtained_rows = obtained.iloc[rows[:max_rows]]
+    columns = [i for i in all_columns
+               if differing(expected_rows, obtained_rows, [i]).any()]
+    diff = pd.concat([expected_rows.iloc[:, columns], obtained_rows.iloc[:, columns]],
+                     axis=1, keys=['expected', 'obtained'])
+    names = ', '.join(str(expected.columns[i]) for i in columns)
+    return Mismatch(f"{len(rows)} row(s) differ, first one is {expected.index[rows[0]]!r}, "
+                    f"in column(s) {names}",
+                    diff=diff)
+
+
+class _EndOfStream:
+    def __repr__(self):
+        return "<end of stream>"
+
+END_OF_STREAM = _EndOfStream()
+
+
+class _Elided:
+    """
+    stands for the items dropped by a StreamWindow; it is not a str,
+    so it can't be mistaken for an actual '...' item
+    """
+    def __repr__(self):
+        return "..."
+
+ELIDED = _Elided()
+
+
+class StreamWindow:
+    """
+    keeps the first size items appended, and the size last ones
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        self.head = []
+        self.tail = deque(maxlen=size)
+        self.count = 0
+
+    def append(self, item):
+        self.count += 1
+        if len(self.head) < self.size:
+            self.head.append(item)
+        else:
+            self.tail.append(item)
+
+    def items(self):
+        """
+        the items kept, with ELIDED in place of the dropped ones if any
+        """
+        dropped = self.count - len(self.head) - len(self.tail)
+        return self.head + ([ELIDED] if dropped else []) + list(self.tail)
+
+
+def compare_streams(expected, obtained, *, window=10):
+    """
+    advances 2 iterables in lockstep, comparing their items with ==,
+    and stops at the first difference - including a length difference
+
+    returns a tuple (verdict, shown) where verdict is either True or a Mismatch
+    instance, whose index is the position of the first difference;
+    when one iterable is shorter, its missing item appears as END_OF_STREAM
+
+    only a bounded number of obtained items are kept, in shown: the first
+    window ones, and the window last ones - i.e. the ones right before
+    the difference - separated with ELIDED when some were dropped;
+    so when both iterables match, the expected items are a better
+    thing to show
+
+    window may also be a StreamWindow instance, that the caller can inspect
+    when the comparison gets interrupted, e.g. by a timeout
+    """
+    shown = window if isinstance(window, StreamWindow) else StreamWindow(window)
+    expected, obtained = iter(expected), iter(obtained)
+    verdict = True
+    for index in itertools.count():
+        expected_item = next(expected, END_OF_STREAM)
+        obtained_item = next(obtained, END_OF_STREAM)
+        if expected_item is END_OF_STREAM and obtained_item is END_OF_STREAM:
+            break
+        if obtained_item is not END_OF_STREAM:
+            shown.append(obtained_item)
+        if expected_item is END_OF_STREAM or obtained_item is END_OF_STREAM \
+                or (expected_item is not obtained_item
+                        and not expected_item == obtained_item):
+            verdict = Mismatch("streams differ", index, expected_item, obtained_item)
+            break
+    return verdict, shown.items()
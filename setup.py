@@ -41,6 +41,8 @@ setuptools.setup(
     entry_points = {
         'console_scripts': [
             'nbae-quiz-scan = nbautoeval.grading.quiz_scan:main',
+            'nbae-precompute = nbautoeval.precompute:main',
+            'nbae-grade = nbautoeval.grading.grade:main',
         ],
     },
     classifiers      = [
@@ -0,0 +1,63 @@
+import numpy as np
+
+from nbautoeval import Args, GeneratorArgs
+from nbautoeval.args import is_immutable
+
+
+def test_is_immutable():
+    for obj in (1, 2.5, "abc", b"abc", None, (1, "a", (2, 3)),
+                frozenset({1, 2}), range(10), len):
+        assert is_immutable(obj)
+    for obj in ([], {}, {1}, (1, []), bytearray(b"abc")):
+        assert not is_immutable(obj)
+    array = np.arange(10)
+    assert not is_immutable(array)
+    array.flags.writeable = False
+    assert is_immutable(array)
+
+
+def test_auto_clone():
+    shared = [1, 2]
+    adn = "ACGT" * 1000
+    args = Args(adn, shared, shared, (1, 2), key=[3], other=(4, 5))
+    clone = args.clone('auto')
+    assert clone.args[0] is adn
+    assert clone.args[3] is args.args[3]
+    assert clone.keywords['other'] is args.keywords['other']
+    assert clone.args[1] == shared and clone.args[1] is not shared
+    # sharing between arguments is preserved, like with deepcopy
+    assert clone.args[1] is clone.args[2]
+    assert clone.keywords['key'] == [3] and clone.keywords['key'] is not args.keywords['key']
+    # flags are cached
+    flags = args._immutable_flags()
+    assert args._immutable_flags() is flags
+    args.args = ([],)
+    assert args._immutable_flags()[0] == [False]
+
+
+def test_auto_clone_generator_args():
+    args = GeneratorArgs("abc", [1], islice=(2, 5))
+    clone = args.clone('auto')
+    assert clone.islice == (2, 5)
+    assert clone.args[0] is args.args[0]
+    assert clone.args[1] is not args.args[1]
+
+
+FINGERPRINT = """
+from nbautoeval import Args
+print(Args({'alpha', 'beta', 'gamma'}, [frozenset('xyz')], key={'a': {'b', 'c'}}).fingerprint())
+"""
+
+def test_fingerprint_hash_seed():
+    import os
+    import sys
+    import subprocess
+    fingerprints = set()
+    for seed in ('1', '2', '3'):
+        completed = subprocess.run([sys.executable, "-c", FINGERPRINT],
+                                   env=dict(os.environ, PYTHONHASHSEED=seed),
+                                   capture_output=True, text=True, check=True)
+        fingerprints.add(completed.stdout.strip())
+    assert len(fingerprints) == 1
+    assert Args({1, 2}).fingerprint() != Args((1, 2)).fingerprint()
+    assert Args({'a': 1, 'b': 2}).fingerprint() != Args({'b': 2, 'a': 1}).fingerprint()
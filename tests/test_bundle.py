@@ -0,0 +1,65 @@
+from nbautoeval import ExerciseFunction, ExerciseClass, ClassScenario, ClassStatement, Args
+from nbautoeval import bundle
+from nbautoeval.bundle import Bundle, write_bundle, use_bundle
+
+
+calls = []
+
+def cube(x):
+    calls.append(x)
+    return x ** 3
+
+cube_inputs = [Args(n) for n in range(5)]
+
+
+def test_bundle(tmp_path, monkeypatch):
+    monkeypatch.setattr(bundle, '_BUNDLES', [])
+    calls.clear()
+    path = tmp_path / "results.nbae"
+    assert write_bundle(path, [ExerciseFunction(cube, cube_inputs)]) == 5
+    assert len(calls) == 5
+
+    exo = ExerciseFunction(cube, cube_inputs)
+    key = exo.bundle_key()
+    assert Bundle(path).keys() == [key]
+    assert Bundle(path).lookup(key, 2, cube_inputs[2].fingerprint()) == (8, False)
+    assert Bundle(path).lookup(key, 2, cube_inputs[3].fingerprint()) is None
+
+    use_bundle(path)
+    exo.correction(cube)
+    # the student function was called, but not the solution
+    assert len(calls) == 10
+    # a dataset that is not in the bundle
+    exo.datasets = cube_inputs + [Args(10)]
+    exo.correction(cube)
+    assert len(calls) == 10 + 6 + 1
+
+
+class Stack:
+    def __init__(self, *items):
+        calls.append(items)
+        self.items = list(items)
+    def __repr__(self):
+        return f"Stack{tuple(self.items)}"
+    def push(self, item):
+        self.items.append(item)
+
+
+stack_scenarios = [
+    ClassScenario(Args(1), ClassStatement("INSTANCE.push(2)"), "len(INSTANCE.items)"),
+    ClassScenario(Args(), "INSTANCE.items"),
+]
+
+
+def test_bundle_class(tmp_path, monkeypatch):
+    monkeypatch.setattr(bundle, '_BUNDLES', [])
+    calls.clear()
+    path = tmp_path / "results.nbae"
+    assert write_bundle(path, [ExerciseClass(Stack, stack_scenarios)]) == 2
+    assert len(calls) == 2
+    use_bundle(path)
+    exo = ExerciseClass(Stack, stack_scenarios)
+    exo.correction(Stack)
+    exo.example()
+    # only the student class was instantiated
+    assert len(calls) == 4
@@ -0,0 +1,219 @@
+import os
+
+from ipywidgets import Widget
+
+from nbautoeval import ExerciseClass, ClassScenario, ScenarioBranch, ClassStatement, Args
+from nbautoeval import exercise_class
+
+
+class Counter:
+    def __init__(self, start=0):
+        self.value = start
+    def __repr__(self):
+        return f"Counter({self.value})"
+    def incr(self, step=1):
+        self.value += step
+        return self.value
+
+class WrongCounter(Counter):
+    def incr(self, step=1):
+        self.value += 1
+        return self.value
+
+
+class CrashingCounter(Counter):
+    def incr(self, step=1):
+        if step == 2:
+            os._exit(1)
+        return super().incr(step)
+
+class LoopingCounter(Counter):
+    def incr(self, step=1):
+        while step == 3:
+            pass
+        return super().incr(step)
+
+
+counter_scenarios = [
+    ClassScenario(Args(), "INSTANCE.incr()", "INSTANCE.incr()"),
+    ClassScenario(Args(10), "INSTANCE.incr(2)", "INSTANCE.incr()"),
+    ClassScenario(Args(), "INSTANCE.incr(3)"),
+]
+
+
+def test_correction(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_class, 'log2_correction',
+                        lambda name, timings, **kwds: logged.update(kwds))
+    exo = ExerciseClass(Counter, counter_scenarios)
+    assert isinstance(exo.correction(Counter), Widget)
+    assert logged == dict(success=True, passed=3, failed=0, skipped=0)
+    exo.correction(WrongCounter)
+    assert logged == dict(success=False, passed=1, failed=2, skipped=0)
+    exo.correction(WrongCounter, fail_fast=True)
+    assert logged == dict(success=False, passed=1, failed=1, skipped=1)
+
+
+def test_stream(monkeypatch):
+    displayed = []
+    monkeypatch.setattr('IPython.display.display', displayed.append)
+    exo = ExerciseClass(Counter, counter_scenarios, stream=True)
+    assert exo.correction(WrongCounter) is None
+    grid, = displayed
+    assert len(grid.children) == len(exo.correction(WrongCounter, stream=False).children)
+    # each scenario is shown before the next one runs
+    sizes = []
+    runs = exo._scenario_runs
+    def scenario_runs(*args):
+        for run in runs(*args):
+            yield run
+            sizes.append(len(displayed[-1].children))
+    monkeypatch.setattr(exo, '_scenario_runs', scenario_runs)
+    exo.correction(WrongCounter)
+    assert 0 < sizes[0] < sizes[1] < sizes[2] == len(displayed[-1].children)
+
+
+def test_timings(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_class, 'log2_correction',
+                        lambda name, **kwds: logged.update(kwds))
+    exo = ExerciseClass(Counter, counter_scenarios, show_timings=True)
+    grid = exo.correction(WrongCounter)
+    # css, then 5 headers and 5 cells per step - __init__ included - for each scenario
+    assert len(grid.children) == 1 + 2 * (5 + 3 * 5) + (5 + 2 * 5)
+    assert set(logged['timings']) == {'clone', 'solution', 'student', 'validate', 'render'}
+
+
+def test_compiled_steps(monkeypatch):
+    compiled = []
+    real_compile = compile
+    monkeypatch.setattr('builtins.compile',
+                        lambda *args: compiled.append(args[0]) or real_compile(*args))
+    scenario = ClassScenario(Args(), ClassStatement("INSTANCE.incr()"),
+                             "[INSTANCE.incr(i) for i in range(3)]",
+                             "isinstance(INSTANCE, CLASS)")
+    exo = ExerciseClass(Counter, [scenario])
+    exo.example()
+    exo.correction(Counter)
+    exo.correction(WrongCounter)
+    # each step is compiled once, whatever the class or the context
+    assert len(compiled) == 3
+    assert scenario.steps[1].run(Counter(), Counter) == [0, 1, 3]
+    assert scenario.steps[2].run(Counter(), Counter)
+
+
+def test_process_executor(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_class, 'log2_correction',
+                        lambda name, timings, **kwds: logged.update(kwds))
+    exo = ExerciseClass(Counter, counter_scenarios, executor='process',
+                        max_workers=2, scenario_timeout=0.5)
+    assert isinstance(exo.correction(Counter), Widget)
+    assert logged == dict(success=True, passed=3, failed=0, skipped=0)
+    # the crash only fails the second scenario
+    exo.correction(CrashingCounter)
+    assert logged == dict(success=False, passed=2, failed=1, skipped=0)
+    exo.correction(LoopingCounter)
+    assert logged == dict(success=False, passed=2, failed=1, skipped=0)
+    step_results = exercise_class.run_scenario(exo, LoopingCounter, counter_scenarios[2])
+    assert [step_result.ok for step_result in step_results] == [True, False]
+    assert step_results[-1].error == "timeout - aborted after 0.5s"
+    # the scenario deadline comes first, and that is the one reported
+    exo.timeout = 5
+    step_results = exercise_class.run_scenario(exo, LoopingCounter, counter_scenarios[2])
+    assert [step_result.ok for step_result in step_results] == [True, False]
+    assert step_results[-1].error == "timeout - aborted after 0.5s"
+    exo.timeout, exo.scenario_timeout = 0.2, 5
+    step_results = exercise_class.run_scenario(exo, LoopingCounter, counter_scenarios[2])
+    assert str(step_results[-1].obtained) == "timeout - aborted after 0.2s"
+
+
+created = []
+
+class RecordedCounter(Counter):
+    def __init__(self, start=0):
+        created.append(start)
+        super().__init__(start)
+    def decr(self):
+        if not self.value:
+            raise ValueError("negative")
+        self.value -= 1
+        return self.value
+
+class LaxCounter(Counter):
+    def decr(self):
+        self.value -= 1
+        return self.value
+
+
+def test_transcripts(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_class, 'log2_correction',
+                        lambda name, timings, **kwds: logged.update(kwds))
+    created.clear()
+    exo = ExerciseClass(RecordedCounter, counter_scenarios)
+    exo.correction(Counter)
+    exo.correction(WrongCounter)
+    exo.example()
+    # the solution only ran once per scenario
+    assert created == [0, 10, 0]
+    exo.invalidate_cache(1)
+    exo.correction(Counter)
+    assert created == [0, 10, 0, 10]
+    # results are rendered as they were at the time of the step
+    scenario = ClassScenario(Args(1), "INSTANCE", "INSTANCE.incr()")
+    step_results = exercise_class.run_scenario(
+        exo, Counter, scenario, transcript=exo._transcript(0, scenario))
+    assert [repr(step_result.expected) for step_result in step_results[1:]] \
+        == ["Counter(1)", "2"]
+    assert repr(step_results[1].obtained) == "Counter(1)"
+    # an exception in the solution is expected from the student code as well
+    exo = ExerciseClass(RecordedCounter, [ClassScenario(Args(1), "INSTANCE.decr()",
+                                                        "INSTANCE.decr()")])
+    exo.correction(RecordedCounter)
+    assert logged == dict(success=True, passed=1, failed=0, skipped=0)
+    exo.correction(LaxCounter)
+    assert logged == dict(success=False, passed=0, failed=1, skipped=0)
+
+
+calls = []
+
+class TracedCounter(Counter):
+    def incr(self, step=1):
+        calls.append(step)
+        return super().incr(step)
+
+class WrongTracedCounter(TracedCounter):
+    def incr(self, step=1):
+        return super().incr(step) if step != 4 else 0
+
+
+def test_scenario_tree(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_class, 'log2_correction',
+                        lambda name, timings, **kwds: logged.update(kwds))
+    tree = ClassScenario(
+        Args(), "INSTANCE.incr(1)", "INSTANCE.incr(2)",
+        branches=[
+            ScenarioBranch("INSTANCE.incr(3)"),
+            ScenarioBranch("INSTANCE.incr(4)", branches=[
+                ScenarioBranch("INSTANCE.incr(5)"),
+                ScenarioBranch("INSTANCE.incr(6)"),
+            ]),
+        ])
+    exo = ExerciseClass(Counter, [counter_scenarios[2], tree])
+    assert [len(scenario.steps) for scenario in exo.scenarios] == [1, 3, 4, 4]
+    assert [scenario.resume_from for scenario in exo.scenarios] \
+        == [None, None, (2, 1), (3, 2)]
+    calls.clear()
+    exo.correction(TracedCounter)
+    assert logged == dict(success=True, passed=4, failed=0, skipped=0)
+    # the shared steps ran only once
+    assert calls == [3, 1, 2, 3, 4, 5, 6]
+    exo.correction(WrongTracedCounter)
+    assert logged == dict(success=False, passed=2, failed=2, skipped=0)
+    # the leaves are regular scenarios when run in worker processes
+    calls.clear()
+    step_results = exercise_class.run_scenario(exo, TracedCounter, exo.scenarios[3])
+    assert calls == [1, 2, 4, 6]
+    assert [step_result.ok for step_result in step_results] == [True] * 5
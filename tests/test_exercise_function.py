@@ -0,0 +1,177 @@
+from ipywidgets import Widget
+
+from nbautoeval import ExerciseFunction, Args
+from nbautoeval import exercise_function
+from nbautoeval.limits import TimeoutExceeded, MemoryExceeded
+
+
+def square(x):
+    return x * x
+
+def wrong_square(x):
+    return x * x if x % 2 else x + x
+
+square_inputs = [Args(n) for n in range(6)]
+
+
+def test_serial():
+    exo = ExerciseFunction(square, square_inputs)
+    assert isinstance(exo.correction(wrong_square), Widget)
+    evaluation = exo.evaluate(wrong_square)
+    assert [result.expected for result in evaluation] == [n*n for n in range(6)]
+    assert [result.ok for result in evaluation] == [True]*4 + [False, True]
+
+
+def test_evaluate():
+    def broken(x):
+        return 1 / (x - 2)
+    evaluation = ExerciseFunction(square, square_inputs).evaluate(broken)
+    assert (evaluation.passed, evaluation.failed, evaluation.skipped) == (0, 6, 0)
+    assert not evaluation.success
+    result = evaluation.results[2]
+    assert (result.index, result.dataset) == (2, square_inputs[2])
+    assert isinstance(result.exception, ZeroDivisionError)
+    assert set(result.timings) == {'clone', 'solution', 'student', 'validate'}
+    assert set(evaluation.timings) == set(result.timings)
+    assert evaluation.to_dict()['results'][2]['exception'].startswith("ZeroDivisionError")
+    evaluation = ExerciseFunction(square, square_inputs).evaluate(broken, fail_fast=True)
+    assert (evaluation.passed, evaluation.failed, evaluation.skipped) == (0, 1, 5)
+
+
+def test_process_executor():
+    exo = ExerciseFunction(square, square_inputs, executor='process', max_workers=2)
+    assert isinstance(exo.correction(wrong_square), Widget)
+    evaluation = exo.evaluate(wrong_square)
+    assert [result.index for result in evaluation] == list(range(6))
+    assert not any(result.ref_exc or result.stu_exc for result in evaluation)
+    assert [result.obtained for result in evaluation] == [wrong_square(n) for n in range(6)]
+
+
+def test_process_executor_fallback(capsys):
+    exo = ExerciseFunction(square, square_inputs, executor='process', max_workers=2)
+    # lambdas can't be pickled
+    evaluation = exo.evaluate(lambda x: x*x)
+    assert "cannot ship" in capsys.readouterr().out
+    assert [result.obtained for result in evaluation] == [n*n for n in range(6)]
+    # neither can instances of local classes
+    class Local(list):
+        pass
+    exo = ExerciseFunction(len, [Args([1]), Args(Local("ab"))],
+                           executor='process', max_workers=2)
+    evaluation = exo.evaluate(len)
+    assert "dataset #2" in capsys.readouterr().out
+    assert [result.obtained for result in evaluation] == [1, 2]
+
+
+def test_cache_expected():
+    calls = []
+    def counted_square(x):
+        calls.append(x)
+        return x * x
+    exo = ExerciseFunction(counted_square, square_inputs)
+    exo.correction(wrong_square)
+    exo.correction(square)
+    exo.example()
+    assert len(calls) == 6
+    # changing a dataset is noticed
+    exo.datasets = [Args(10)] + square_inputs[1:]
+    exo.correction(square)
+    assert calls[6:] == [10]
+    exo.invalidate_cache(1)
+    exo.correction(square)
+    assert calls[7:] == [1]
+    exo.invalidate_cache()
+    exo.correction(square)
+    assert len(calls) == 14
+    # can be turned off
+    exo = ExerciseFunction(counted_square, square_inputs, cache_expected=False)
+    exo.correction(square)
+    exo.correction(square)
+    assert len(calls) == 26
+
+
+
+def test_no_clone_on_cache_hit(monkeypatch):
+    clones = []
+    clone = Args.clone
+    monkeypatch.setattr(Args, 'clone',
+                        lambda self, copy_mode: clones.append(self) or clone(self, copy_mode))
+    result = exercise_function.run_dataset(None, square, Args(3), 'deep')
+    assert (result.expected, result.obtained) == (None, 9)
+    assert len(clones) == 1
+
+
+def slow_square(x):
+    if x == 3:
+        while True:
+            pass
+    return x * x
+
+def stubborn_square(x):
+    # swallows the first interruptions
+    for _ in range(3):
+        try:
+            while x == 3:
+                pass
+        except:                                         # pylint: disable=w0702
+            pass
+    return x * x
+
+def greedy_square(x):
+    if x == 2:
+        return len(bytearray(2**30))
+    return x * x
+
+
+def test_limits():
+    exo = ExerciseFunction(square, square_inputs, timeout=0.2, memory_limit=2**28)
+    results = exo.evaluate(slow_square).results
+    assert isinstance(results[3].exception, TimeoutExceeded)
+    assert [result.obtained for result in results[4:]] == [16, 25]
+    results = exo.evaluate(greedy_square).results
+    assert isinstance(results[2].exception, MemoryExceeded)
+    assert results[3].obtained == 9
+    results = exo.evaluate(stubborn_square).results
+    assert isinstance(results[3].exception, TimeoutExceeded)
+    assert results[4].obtained == 16
+    assert isinstance(exo.correction(slow_square), Widget)
+
+
+def test_fail_fast(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_function, 'log2_correction',
+                        lambda name, timings, **kwds: logged.update(kwds))
+    exo = ExerciseFunction(square, square_inputs)
+    exo.correction(wrong_square, fail_fast=True)
+    # wrong_square is only wrong on 4
+    assert logged == dict(success=False, passed=4, failed=1, skipped=1)
+    exo.correction(wrong_square)
+    assert logged == dict(success=False, passed=5, failed=1, skipped=0)
+    exo.correction(square, fail_fast=True)
+    assert logged == dict(success=True, passed=6, failed=0, skipped=0)
+
+
+def test_stream(monkeypatch):
+    displayed = []
+    monkeypatch.setattr('IPython.display.display', displayed.append)
+    exo = ExerciseFunction(square, square_inputs, stream=True)
+    assert exo.correction(wrong_square) is None
+    grid, = displayed
+    # headers + css, then 4 cells per dataset
+    assert len(grid.children) == len(exo.column_headers) + 1 + 4 * 6
+    expected = exo.correction(wrong_square, stream=False)
+    assert len(expected.children) == len(grid.children)
+
+
+def test_timings(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_function, 'log2_correction',
+                        lambda name, **kwds: logged.update(kwds))
+    exo = ExerciseFunction(square, square_inputs, show_timings=True)
+    grid = exo.correction(wrong_square)
+    # one more column
+    assert len(grid.children) == len(exo.column_headers) + 2 + 5 * 6
+    assert set(logged['timings']) == {'clone', 'solution', 'student', 'validate', 'render'}
+    # the solution results are cached
+    exo.correction(wrong_square)
+    assert 'solution' not in logged['timings']
@@ -0,0 +1,76 @@
+from ipywidgets import Widget
+
+from nbautoeval import ExerciseClassFuzz, ClassScenario, Args
+from nbautoeval import exercise_class
+from nbautoeval.exercise_fuzz import draw_args
+
+
+class Stack:
+    def __init__(self, *items):
+        self.items = list(items)
+    def __repr__(self):
+        return f"Stack{tuple(self.items)}"
+    def push(self, item):
+        self.items.append(item)
+    def pop(self):
+        return self.items.pop()
+    def size(self):
+        return len(self.items)
+
+class LeakyStack(Stack):
+    # the third push loses the bottom item
+    pushes = 0
+    def push(self, item):
+        super().push(item)
+        self.pushes += 1
+        if self.pushes == 3:
+            del self.items[0]
+
+class QueueStack(Stack):
+    # pops from the wrong end
+    def pop(self):
+        return self.items.pop(0)
+
+
+stack_methods = {
+    'push': lambda rng: Args(rng.randint(0, 9)),
+    'pop': None,
+    'size': None,
+}
+
+
+def test_draw_args():
+    import random
+    rng = random.Random(0)
+    assert draw_args(None, rng).args == ()
+    args = Args(1)
+    assert draw_args(args, rng) is args
+    assert draw_args([args], rng) is args
+    assert draw_args(lambda rng: Args(rng.randint(5, 5)), rng).args == (5,)
+
+
+def test_fuzz(monkeypatch):
+    logged = {}
+    monkeypatch.setattr(exercise_class, 'log2_correction',
+                        lambda name, timings, **kwds: logged.update(kwds))
+    exo = ExerciseClassFuzz(Stack, stack_methods, [ClassScenario(Args(1), "INSTANCE.pop()")],
+                            nb_sequences=200)
+    assert exo.fuzz(Stack) is None
+    exo.correction(Stack)
+    assert logged == dict(success=True, passed=1, failed=0, skipped=0)
+    # the hand-written scenario passes, but not the random ones
+    scenario, step_results = exo.fuzz(QueueStack)
+    assert not step_results[-1].ok
+    assert [step.methodname for step in scenario.steps] == ['push', 'push', 'pop']
+    assert len(step_results) == 4
+    assert scenario.note.startswith("séquence aléatoire")
+    assert isinstance(exo.correction(QueueStack), Widget)
+    assert logged == dict(success=False, passed=1, failed=1, skipped=0)
+    exo.correction(LeakyStack)
+    assert logged == dict(success=False, passed=1, failed=1, skipped=0)
+    # a difference that shows only in the object state
+    scenario, _ = exo.fuzz(LeakyStack)
+    assert [step.methodname for step in scenario.steps[:-1]] == ['push'] * 3
+    assert scenario.steps[-1].code == "INSTANCE"
+    # the sequences are the same from one run to the other
+    assert exo.fuzz(LeakyStack)[0].fingerprint() == scenario.fingerprint()
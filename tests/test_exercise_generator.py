@@ -0,0 +1,130 @@
+from itertools import count
+
+from ipywidgets import Widget
+
+from nbautoeval import ExerciseGenerator, GeneratorArgs
+from nbautoeval.validation import compare_streams, END_OF_STREAM, ELIDED
+from nbautoeval.exercise_generator import DEFAULT_TIMEOUT
+from nbautoeval.limits import TimeoutExceeded
+
+
+def squares(n):
+    for i in range(n):
+        yield i**2
+
+def squares_inputs():
+    return [
+        GeneratorArgs(5),
+        GeneratorArgs(10, islice=(2, 8)),
+        GeneratorArgs(100),
+    ]
+
+
+def test_compare_streams():
+    assert compare_streams(range(5), iter(range(5))) == (True, [0, 1, 2, 3, 4])
+    verdict, shown = compare_streams(range(100), range(100), window=3)
+    assert verdict
+    assert shown == [0, 1, 2, ELIDED, 97, 98, 99]
+    verdict, shown = compare_streams(range(100), list(range(50)) + ['...'] * 50, window=3)
+    assert verdict.index == 50
+    assert shown[3] is ELIDED and shown[-1] == '...'
+    verdict, shown = compare_streams([1, 2, 3], [1, 2, 4, 5])
+    assert (verdict.index, verdict.expected, verdict.obtained) == (2, 3, 4)
+    assert shown == [1, 2, 4]
+    verdict, _ = compare_streams([1, 2, 3], [1, 2])
+    assert (verdict.index, verdict.obtained) == (2, END_OF_STREAM)
+    verdict, _ = compare_streams([1], count(1))
+    assert (verdict.index, verdict.expected) == (1, END_OF_STREAM)
+
+
+def test_lockstep():
+    consumed = []
+    def wrong_squares(n):
+        for i in count():
+            consumed.append(i)
+            yield i**2 if i != 3 else 0
+    exo = ExerciseGenerator(squares, squares_inputs(), window=4)
+    evaluation = exo.evaluate(wrong_squares)
+    assert [result.ok for result in evaluation] == [False, False, False]
+    # the infinite student generator is not consumed past the difference
+    assert consumed == [0, 1, 2, 3] * 3
+    result = evaluation.results[0]
+    assert result.obtained == [0, 1, 4, 0]
+    assert result.mismatch.index == 3
+    assert isinstance(exo.correction(wrong_squares), Widget)
+    evaluation = exo.evaluate(squares)
+    assert evaluation.success
+    # a long, correct, stream is shown in full
+    assert evaluation.results[2].obtained == [n*n for n in range(100)]
+
+
+def test_max_iterations():
+    exo = ExerciseGenerator(count, [GeneratorArgs(), GeneratorArgs(islice=(2, 4))],
+                            max_iterations=5)
+    evaluation = exo.evaluate(count)
+    assert evaluation.success
+    assert evaluation.results[0].expected == [0, 1, 2, 3, 4, '...']
+    evaluation = exo.evaluate(lambda: iter(range(5)))
+    assert [result.ok for result in evaluation] == [False, True]
+    assert evaluation.results[0].mismatch.index == 5
+
+
+def test_timeout():
+    def spinning(n):
+        yield from (0, 1, 4)
+        while True:
+            pass
+    exo = ExerciseGenerator(squares, [GeneratorArgs(5), GeneratorArgs(5, islice=(4, 5))],
+                            timeout=0.2)
+    evaluation = exo.evaluate(spinning)
+    assert [result.ok for result in evaluation] == [False, False]
+    first, second = evaluation.results
+    assert first.obtained == [0, 1, 4]
+    assert isinstance(first.obtained.exc, TimeoutExceeded)
+    assert not first.stu_exc
+    assert "after 3 item(s)" in str(first.mismatch)
+    # nothing went through islice
+    assert second.obtained == []
+    assert "after 3 item(s)" in str(second.mismatch)
+    assert isinstance(exo.correction(spinning), Widget)
+    assert ExerciseGenerator(squares, []).timeout == DEFAULT_TIMEOUT
+
+
+def test_shared_prefix():
+    calls = []
+    def counted_squares(n):
+        calls.append(n)
+        yield from squares(n)
+    inputs = [
+        GeneratorArgs(10, islice=(2, 4)),
+        GeneratorArgs(10, islice=(5, 8)),
+        GeneratorArgs(10),
+        GeneratorArgs(3),
+    ]
+    exo = ExerciseGenerator(counted_squares, inputs)
+    evaluation = exo.evaluate(counted_squares)
+    assert evaluation.success
+    assert [result.expected for result in evaluation] == [
+        [4, 9], [25, 36, 49], [n*n for n in range(10)], [0, 1, 4]]
+    # one instance for each distinct call, for the solution and for the student
+    assert calls == [10, 10, 3, 3]
+    # the shared iterator does not hide errors
+    def broken(n):
+        yield from squares(6)
+        raise ValueError(n)
+    results = exo.evaluate(broken).results
+    assert [result.ok for result in results] == [True, False, False, False]
+    assert isinstance(results[1].exception, ValueError)
+    assert isinstance(results[2].exception, ValueError)
+
+
+def test_shared_memory():
+    from itertools import islice
+    from nbautoeval.exercise_generator import _SharedStream
+    shared = _SharedStream(iter(range(2000)))
+    assert list(islice(shared.reader(0, [1000, 1500]), 1200)) == list(range(1200))
+    # only what the next readers need is kept
+    assert shared.items == list(range(1000, 1200))
+    assert list(islice(shared.reader(1000, [1500]), 1000, 1100)) == list(range(1000, 1100))
+    assert list(islice(shared.reader(1500), 1500, 1600)) == list(range(1500, 1600))
+    assert shared.items == []
@@ -0,0 +1,74 @@
+import random
+
+from ipywidgets import Widget
+
+from nbautoeval import ExerciseFunctionPerf, Args
+from nbautoeval.exercise_function import InvalidSubmission
+from nbautoeval.exercise_perf import geometric_sizes, fit_exponent
+
+
+def test_helpers():
+    assert geometric_sizes(10, 1000, 3) == [10, 100, 1000]
+    sizes = [10, 100, 1000]
+    assert round(fit_exponent(sizes, [size ** 2 / 1e6 for size in sizes]), 6) == 2
+    assert fit_exponent([10], [1.]) is None
+
+
+def increasing(items):
+    return sorted(items)
+
+def bubble(items):
+    items = list(items)
+    for i in range(len(items)):
+        for j in range(len(items) - 1 - i):
+            if items[j] > items[j+1]:
+                items[j], items[j+1] = items[j+1], items[j]
+    return items
+
+def decreasing(items):
+    return sorted(items, reverse=True)
+
+def random_list(size):
+    return Args([random.random() for _ in range(size)])
+
+
+def test_perf():
+    exo = ExerciseFunctionPerf(increasing, random_list, geometric_sizes(50, 800, 3),
+                               max_ratio=10**6)
+    assert [dataset.size for dataset in exo.datasets] == [50, 200, 800]
+    evaluation = exo.evaluate(bubble)
+    # correct but way too slow
+    assert evaluation.failed == 0
+    assert evaluation.stu_exponent > evaluation.ref_exponent + 0.5
+    assert not evaluation.success
+    # the solution passes against itself, cold first calls notwithstanding
+    for _ in range(3):
+        assert ExerciseFunctionPerf(increasing, random_list).evaluate(increasing).success
+    # much slower than the solution already on the smallest size
+    larger = ExerciseFunctionPerf(increasing, random_list, geometric_sizes(500, 50_000, 3))
+    evaluation = larger.evaluate(bubble)
+    assert (evaluation.passed, evaluation.skipped) == (1, 2)
+    assert not evaluation.success
+    # correct, but too slow
+    assert evaluation.grade == 0
+    evaluation = exo.evaluate(decreasing)
+    assert evaluation.failed == 3
+    assert not evaluation.success
+    assert isinstance(exo.correction(bubble), Widget)
+
+
+class SortingPerf(ExerciseFunctionPerf):
+    def student_solution(self, submission):
+        if not callable(submission):
+            raise InvalidSubmission(f"{submission!r} is not a function")
+        return submission
+
+
+def test_invalid_submission():
+    exo = SortingPerf(increasing, random_list, [10, 100])
+    evaluation = exo.evaluate("sorted")
+    assert evaluation.error == "'sorted' is not a function"
+    assert not evaluation.success
+    assert isinstance(exo.correction("sorted"), Widget)
+    # the same contract as ExerciseFunction._evaluate()
+    assert all(entry is None for (_, entry) in exo._evaluate(increasing, False))
@@ -0,0 +1,67 @@
+from ipywidgets import Widget
+
+from nbautoeval import ExerciseRegexp, ExerciseRegexpGroups, Args
+from nbautoeval.limits import TimeoutExceeded
+
+
+inputs = [Args("aaa"), Args("ab"), Args("a" * 30 + "b")]
+
+
+def test_regexp():
+    exo = ExerciseRegexp('only_as', r'a+\Z', inputs)
+    assert exo.evaluate(r'a+\Z').success
+    evaluation = exo.evaluate(r'a+')
+    assert (evaluation.passed, evaluation.failed) == (3, 0)
+    evaluation = exo.evaluate(r'b')
+    assert evaluation.failed == 1
+
+
+def test_invalid_regexp():
+    exo = ExerciseRegexp('only_as', r'a+\Z', inputs)
+    evaluation = exo.evaluate(r'(a+')
+    assert not evaluation.success
+    assert evaluation.error.startswith("invalid regexp '(a+'")
+    assert (evaluation.passed, evaluation.failed, evaluation.skipped) == (0, 1, 2)
+    grid = exo.correction(r'(a+')
+    assert isinstance(grid, Widget)
+    groups = ExerciseRegexpGroups('groups', r'(?P<a>a+)', ['a'], inputs)
+    assert groups.evaluate(r'(?P<a>a+').error
+
+
+def test_backtracking():
+    exo = ExerciseRegexp('only_as', r'a+\Z', inputs, timeout=0.2)
+    evaluation = exo.evaluate(r'(a+)+\Z')
+    assert isinstance(evaluation.results[2].exception, TimeoutExceeded)
+    assert evaluation.passed == 2
+
+
+def test_corpus(tmp_path):
+    from nbautoeval import ExerciseRegexpCorpus
+    path = tmp_path / "log.txt"
+    path.write_text("".join(f"{level} message {n}\n"
+                            for n in range(1000) for level in ("INFO", "ERROR")))
+    exo = ExerciseRegexpCorpus('errors', r'ERROR .* \d+', path, match_mode='search')
+    assert [dataset.args[0] for dataset in exo.datasets] == [
+        "INFO message 0", "ERROR message 0", "INFO message 1"]
+    assert exo.evaluate(r'ERROR.*').success
+    evaluation = exo.evaluate(r'ERROR .* \d')
+    # ERROR lines with 2 digits or more disagree
+    assert (evaluation.passed, evaluation.failed) == (2000 - 990, 990)
+    assert evaluation.grade == (2000 - 990) / 2000
+    assert len(evaluation.results) == 10
+    assert evaluation.results[0].index == 21
+    evaluation = exo.evaluate(r"(ERROR")
+    assert evaluation.error and (evaluation.passed, evaluation.failed) == (0, 1)
+    assert isinstance(exo.correction(r'ERROR .* \d'), Widget)
+
+    exo = ExerciseRegexpCorpus('numbers', r'\d+', path, unit='buffer', max_shown=2)
+    evaluation = exo.evaluate(r'\d')
+    # numbers with 2 digits or more disagree
+    assert evaluation.failed > evaluation.passed > 0
+    assert [(result.dataset, result.obtained) for result in evaluation] == [("1", True), ("10", False)]
+    assert exo.evaluate(r'[0-9]+').success
+    assert isinstance(exo.correction(r'\d'), Widget)
+    # the solution results follow changes in the file
+    path.write_text("1 22 333\n")
+    assert exo.evaluate(r'[0-9]+').success
+    assert exo.evaluate(r'\d').passed == 1
@@ -0,0 +1,97 @@
+import sys
+import json
+
+from nbautoeval.grading.grade import (
+    grade_all, write_csv, load_exercises, DEFAULT_TIMEOUT)
+
+
+EXERCISES = """
+from nbautoeval import ExerciseFunction, Args
+
+def double(x):
+    return 2 * x
+
+exo_double = ExerciseFunction(double, [Args(n) for n in range(4)])
+
+def negate(x):
+    return -abs(x)
+
+exo_negate = ExerciseFunction(negate, [Args(n) for n in range(4)])
+"""
+
+STUDENTS = {
+    'alice': "def double(x): return x + x\ndef negate(x): return -x\n",
+    'bob': "def double(x): return x * x\n",
+    'carol': "raise SystemExit('oops')\n",
+    # kills its worker process
+    'dave': "import os\ndef double(x): os._exit(1)\n",
+    # loops forever
+    'eve': "def double(x):\n    while True: pass\n",
+    # a side effect that should not leak into the other students
+    'abe': "import builtins\nbuiltins.abs = lambda x: 0\n",
+}
+
+
+def test_grade(tmp_path, monkeypatch):
+    (tmp_path / "grade_exercises.py").write_text(EXERCISES)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'grade_exercises', raising=False)
+    students = tmp_path / "students"
+    students.mkdir()
+    for student, code in STUDENTS.items():
+        (students / f"{student}.py").write_text(code)
+
+    gradebook = grade_all(sorted(students.glob("*.py")), ['grade_exercises'],
+                          timeout=0.2, max_workers=2)
+    assert gradebook['alice']['double']['grade'] == 1
+    assert gradebook['alice']['negate']['grade'] == 1
+    # x * x == 2 * x for 0 and 2
+    assert gradebook['bob']['double']['grade'] == 0.5
+    assert gradebook['bob']['negate'] == dict(grade=0, error="missing")
+    assert gradebook['carol']['double']['error'].startswith("cannot import")
+    assert gradebook['dave'] == {exoname: dict(grade=0, error="the worker process died")
+                                 for exoname in ('double', 'negate')}
+    assert gradebook['eve']['double']['grade'] == 0
+    assert gradebook['abe']['negate'] == dict(grade=0, error="missing")
+    assert [exo.timeout for exo in load_exercises(['grade_exercises'])] \
+        == [DEFAULT_TIMEOUT] * 2
+    json.dumps(gradebook)
+
+    output = tmp_path / "grades.csv"
+    write_csv(gradebook, ['double', 'negate'], output)
+    lines = output.read_text().splitlines()
+    assert lines[0] == "student,double,negate,total"
+    assert lines[3] == "bob,0.5,0,0.5"
+
+
+def test_isolation(tmp_path, monkeypatch):
+    (tmp_path / "grade_exercises.py").write_text(EXERCISES)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'grade_exercises', raising=False)
+    paths = []
+    for student in ('abe', 'alice'):
+        paths.append(tmp_path / f"{student}.py")
+        paths[-1].write_text(STUDENTS[student])
+    # with a single worker, alice comes right after abe
+    gradebook = grade_all(paths, ['grade_exercises'], max_workers=1)
+    assert gradebook['alice']['negate']['grade'] == 1
+
+
+def test_crash(tmp_path, monkeypatch):
+    from nbautoeval.grading import grade
+    (tmp_path / "grade_exercises.py").write_text(EXERCISES)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'grade_exercises', raising=False)
+    paths = []
+    for student in ('dave', 'alice', 'bob'):
+        paths.append(tmp_path / f"{student}.py")
+        paths[-1].write_text(STUDENTS[student])
+    alone = []
+    def grade_alone(path, *args):
+        alone.append(path.stem)
+    monkeypatch.setattr(grade, 'grade_alone', grade_alone)
+    # only the student that was running gets graded on its own
+    gradebook = grade_all(paths, ['grade_exercises'], max_workers=1)
+    assert alone == ['dave']
+    assert gradebook['alice']['negate']['grade'] == 1
+    assert gradebook['bob']['double']['grade'] == 0.5
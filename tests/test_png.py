@@ -0,0 +1,79 @@
+import zlib
+import struct
+import base64
+import weakref
+
+import numpy as np
+
+from nbautoeval import png
+from nbautoeval.png import png_base64, to_pixels, downsample
+
+
+def decode(b64):
+    """
+    returns (width, height, color_type, rows) for our own PNG files
+    """
+    data = base64.b64decode(b64)
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, offset = {}, 8
+    while offset < len(data):
+        length, = struct.unpack(">I", data[offset:offset+4])
+        kind = data[offset+4:offset+8]
+        chunk = data[offset+8:offset+8+length]
+        crc, = struct.unpack(">I", data[offset+8+length:offset+12+length])
+        assert crc == zlib.crc32(kind + chunk)
+        chunks[kind] = chunk
+        offset += 12 + length
+    width, height, _, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    raw = zlib.decompress(chunks[b"IDAT"])
+    return width, height, color_type, raw
+
+
+def test_encode():
+    array = np.array([[0., 1., 2.], [3., 4., np.nan]])
+    width, height, color_type, raw = decode(png_base64(array, cmap='gray'))
+    assert (width, height, color_type) == (3, 2, 6)
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(2, 1 + 3 * 4)
+    assert list(rows[:, 0]) == [0, 0]
+    pixels = rows[:, 1:].reshape(2, 3, 4)
+    assert list(pixels[0, :, 0]) == [0, 63, 127]
+    assert list(pixels[:, 2, 3]) == [255, 0]
+    rgb = np.zeros((4, 5, 3), dtype=np.uint8)
+    assert decode(png_base64(rgb))[:3] == (5, 4, 2)
+
+
+def test_helpers():
+    assert to_pixels(np.eye(3)).shape == (3, 3, 3)
+    assert (to_pixels(np.eye(3), 'viridis')[0, 0] == png.lookup_table(None)[-1]).all()
+    assert downsample(np.zeros((1000, 10)), 256).shape == (250, 3)
+
+
+def test_cache(monkeypatch):
+    monkeypatch.setattr(png, '_CACHE', {})
+    array = np.arange(100).reshape(10, 10)
+    first = png_base64(array)
+    assert png_base64(array.copy()) is first
+    assert png_base64(array + 1) is not first
+    assert len(png._CACHE) == 2
+
+
+class PlainColormap:
+    # duck-typed like a matplotlib Colormap
+    def __init__(self, color):
+        self.color = color
+    def __call__(self, samples):
+        return np.tile([*self.color, 1.], (len(samples), 1))
+
+def test_cache_colormaps(monkeypatch):
+    monkeypatch.setattr(png, '_CACHE', {})
+    monkeypatch.setattr(png, '_LUTS', {})
+    array = np.arange(100).reshape(10, 10)
+    red = PlainColormap((1, 0, 0))
+    image = png_base64(array, cmap=red)
+    # the colormap is kept alive, so its id() can't be reused by another one
+    alive = weakref.ref(red)
+    del red
+    assert alive() is not None
+    # the images are cached according to the colors
+    assert png_base64(array, cmap=PlainColormap((1, 0, 0))) is image
+    assert png_base64(array, cmap=PlainColormap((0, 0, 1))) != image
@@ -0,0 +1,29 @@
+from nbautoeval.renderer import preview, SizeAwareRenderer, PPrintRenderer
+
+
+def test_preview_small():
+    for obj in ([1, 2, 3], (1,), (), {'a': [1, (2,)]}, set(), {1, 2},
+                frozenset({1}), "abc", b"abc", 3.5, None, [[]]):
+        assert preview(obj) == (repr(obj), False)
+    # containers are not elided as long as they fit
+    obj = list(range(100))
+    assert preview(obj) == (repr(obj), False)
+
+
+def test_preview_large():
+    text, truncated = preview(list(range(10**6)), head=2, tail=1)
+    assert truncated
+    assert text == "[0, 1, ..., 999999] <1000000 items>"
+    text, truncated = preview({n: n for n in range(100)}, max_chars=100, head=1)
+    assert text == "{0: 0, ...} <100 items>"
+    text, truncated = preview("x" * 10**6, max_chars=10)
+    assert text == "'xxxxx'...<1000000 chars>"
+    # the budget applies to nested objects as well
+    text, truncated = preview([[0] * 10] * 10**4, max_chars=100)
+    assert truncated and len(text) < 200
+
+
+def test_renderers():
+    assert SizeAwareRenderer(max_chars=20).render("x" * 100).text.endswith("<100 chars>")
+    assert PPrintRenderer().render(list(range(10**5))).text.endswith("<100000 items>")
+    assert "\n" in PPrintRenderer(width=10).render([1, 2, 3, 4]).text
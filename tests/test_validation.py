@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from nbautoeval import ExerciseFunctionNumpy, ExerciseFunctionPandas, Args
+from nbautoeval.validation import compare_arrays, compare_frames, Mismatch
+
+
+def test_compare_arrays():
+    expected = np.arange(12.).reshape(3, 4)
+    assert compare_arrays(expected, expected + 1e-9) is True
+    obtained = expected.copy()
+    obtained[2, 1] = 0
+    mismatch = compare_arrays(expected, obtained, chunk_size=4)
+    assert isinstance(mismatch, Mismatch) and not mismatch
+    assert mismatch.index == (2, 1)
+    assert "at index (2, 1)" in str(mismatch)
+    assert not compare_arrays(expected, expected.T)
+    assert not compare_arrays(expected, expected.astype(str))
+    # non-contiguous views
+    assert compare_arrays(expected[:, ::2], expected.T.T[:, ::2], chunk_size=1) is True
+    nans = np.array([1., np.nan])
+    assert not compare_arrays(nans, nans)
+    assert compare_arrays(nans, nans, equal_nan=True) is True
+    assert compare_arrays(np.array(3), np.array(3)) is True
+    assert str(compare_arrays(np.array(['a']), np.array(['b']))).startswith("different values")
+
+
+class Counted:
+    compared = 0
+    def __init__(self, value):
+        self.value = value
+    def __eq__(self, other):
+        Counted.compared += 1
+        return self.value == other.value
+
+
+def test_compare_arrays_wide():
+    # a single row is still compared chunk by chunk
+    expected = np.array([[Counted(n) for n in range(10_000)]], dtype=object)
+    obtained = expected.copy()
+    obtained[0, 5] = Counted(-1)
+    Counted.compared = 0
+    mismatch = compare_arrays(expected, obtained, chunk_size=100)
+    assert mismatch.index == (0, 5)
+    assert Counted.compared <= 100
+    wide = np.arange(10_000.).reshape(2, 5000)
+    other = wide.copy()
+    other[1, 4999] = 0
+    assert compare_arrays(wide, other, chunk_size=64).index == (1, 4999)
+    assert compare_arrays(wide.T, wide.T.copy(), chunk_size=64) is True
+
+
+def double(array):
+    return 2 * array
+
+def almost_double(array):
+    result = 2 * array
+    result[-1] += 1
+    return result
+
+
+def test_numpy_exercise():
+    exo = ExerciseFunctionNumpy(double, [Args(np.arange(n)) for n in range(1, 4)])
+    evaluation = exo.evaluate(almost_double)
+    assert evaluation.failed == 3
+    assert evaluation.results[2].mismatch.index == (2,)
+    assert exo.evaluate(double).success
+    # not arrays: same as before
+    assert exo.validate(2, 2.)
+
+
+def test_compare_frames():
+    expected = pd.DataFrame(dict(name=list("abcdef"), value=np.arange(6) / 3))
+    assert compare_frames(expected, expected.copy()) is True
+    assert "columns" in str(compare_frames(expected, expected[['value', 'name']]))
+    assert "dtype" in str(compare_frames(expected, expected.astype({'value': 'float32'})))
+    assert "index" in str(compare_frames(expected, expected.iloc[::-1].reset_index(drop=True)
+                                         .set_axis(expected.index[::-1])))
+    obtained = expected.copy()
+    obtained.loc[[1, 4], 'name'] = 'x'
+    obtained['value'] += 1e-9
+    mismatch = compare_frames(expected, obtained)
+    assert str(mismatch).startswith("6 row(s) differ")
+    mismatch = compare_frames(expected, obtained, atol=1e-6, max_rows=1)
+    assert str(mismatch) == "2 row(s) differ, first one is 1, in column(s) name"
+    assert mismatch.diff.shape == (1, 2)
+    series = expected['value']
+    assert compare_frames(series, series.copy()) is True
+    assert not compare_frames(series, series.rename('other'))
+    # equal values with different hashes
+    zeros = pd.DataFrame(dict(x=[0., 1.], y=pd.Series([1, None], dtype=object)))
+    negative = pd.DataFrame(dict(x=[-0., 1.], y=pd.Series([1., np.nan], dtype=object)))
+    assert zeros.equals(negative)
+    assert compare_frames(zeros, negative) is True
+    negative.loc[0, 'y'] = 2
+    assert str(compare_frames(zeros, negative)) \
+        == "1 row(s) differ, first one is 0, in column(s) y"
+
+
+def add_column(df):
+    return df.assign(total=df.sum(axis=1))
+
+def add_wrong_column(df):
+    return df.assign(total=df.sum(axis=1).where(df.index != 2, 0))
+
+
+def test_pandas_exercise():
+    frame = pd.DataFrame(dict(x=range(100), y=range(100)))
+    exo = ExerciseFunctionPandas(add_column, [Args(frame)])
+    assert exo.evaluate(add_column).success
+    result, = exo.evaluate(add_wrong_column)
+    assert result.mismatch.diff.shape == (1, 2)
+    exo.correction(add_wrong_column)